@@ -0,0 +1,42 @@
+"""
+Playouts per second of the parallel MCTS for 1, 2, 4 and 8 worker processes.
+
+Run from the project root:
+    python benchmarks/parallel_mcts.py [--seconds 5] [--sizes 9 19] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from game.board import Board
+from game.parallel_mcts import ParallelMCTS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0, help="search time per measurement")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[9, 19])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--modes", nargs="+", default=["root", "tree"], choices=["root", "tree"])
+    args = parser.parse_args()
+
+    print(f"{'size':>5} {'mode':>5} {'workers':>8} {'playouts':>9} {'playouts/s':>11} {'speedup':>8}")
+    for size in args.sizes:
+        for mode in args.modes:
+            baseline = None
+            for workers in args.workers:
+                search = ParallelMCTS(size, workers=workers, mode=mode, max_visits=10 ** 9, seed=0)
+                try:
+                    search.search(Board(size), max_time=0.2)  # Warm up the worker processes
+                    search.search(Board(size), max_time=args.seconds)
+                finally:
+                    search.close()
+                rate = search.simulations / args.seconds
+                baseline = baseline or rate
+                print(f"{size:>5} {mode:>5} {workers:>8} {search.simulations:>9} {rate:>11.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Random playouts per second on 9x9, 13x13 and 19x19 boards.
+
+Compares game.playout.PlayoutBoard with playing the same kind of random
+game through game.board.Board.place_stone. Run from the project root:
+    python benchmarks/playouts.py [--seconds 3] [--sizes 9 13 19]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from game.board import Board
+from game.playout import PlayoutBoard
+
+
+def playout_board_game(size, seed):
+    board = PlayoutBoard(size, seed)
+    moves = board.playout()
+    board.score()
+    return moves
+
+
+def full_board_game(size, seed):
+    """Random game through Board: try empty points in random order until one is legal."""
+    rng = random.Random(seed)
+    board = Board(size)
+    moves = passes = 0
+    while passes < 2 and moves < 3 * size * size:
+        empty = [point for point, chain in enumerate(board.chains) if chain is None]
+        rng.shuffle(empty)
+        for point in empty:
+            player = board.current_player
+            # Skip points surrounded by our own stones, like the playout engine does with eyes
+            if all(board.chains[n] is not None and board.chains[n].color == player for n in board.neighbors[point]):
+                continue
+            if board.play(point % size, point // size):
+                passes = 0
+                break
+        else:
+            board.play(None, None)
+            passes += 1
+        moves += 1
+    board.calculate_score()
+    return moves
+
+
+def measure(game, size, seconds):
+    start = time.perf_counter()
+    games = moves = 0
+    while time.perf_counter() - start < seconds:
+        moves += game(size, games)
+        games += 1
+    elapsed = time.perf_counter() - start
+    return games / elapsed, moves / games
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0, help="measuring time per engine and size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[9, 13, 19])
+    args = parser.parse_args()
+
+    print(f"{'size':>5} {'engine':>13} {'playouts/s':>11} {'moves/playout':>14}")
+    for size in args.sizes:
+        for name, game in (("PlayoutBoard", playout_board_game), ("Board", full_board_game)):
+            rate, moves = measure(game, size, args.seconds)
+            print(f"{size:>5} {name:>13} {rate:>11.1f} {moves:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Benchmark suite for the engine, environment and AI hot paths.
+
+Every benchmark replays the same recorded games (benchmarks/positions.json,
+random games played with a fixed seed) on 9x9, 13x13 and 19x19 boards and
+reports the time per operation in microseconds, as the median and minimum over
+--repeat runs. Benchmarks whose dependencies (gym, stable-baselines3, torch,
+imitation) are not installed are skipped and listed as such.
+
+Run from the project root:
+    python benchmarks/run.py --output before.json
+    python benchmarks/run.py --output after.json
+    python benchmarks/run.py --compare before.json after.json [--threshold 0.1]
+
+--compare exits with status 1 when a benchmark got slower by more than the
+threshold. --record rewrites positions.json; results are only comparable
+between runs on the same recorded games.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from game.board import Board
+from game.heuristics import score_moves
+
+POSITIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "positions.json")
+SIZES = (9, 13, 19)
+
+
+def record_games(sizes=SIZES, games=3, seed=0):
+    """Play random legal games until two passes in a row (or 3 * size * size moves) with a fixed seed."""
+    rng = random.Random(seed)
+    recorded = {}
+    for size in sizes:
+        recorded[str(size)] = []
+        for _ in range(games):
+            board = Board(size)
+            moves = []
+            while len(moves) < 3 * size * size and moves[-2:] != [size * size] * 2:
+                legal = np.flatnonzero(board.legal_moves().T.ravel())
+                # Pass one time in ten once the board fills up, like a random player running out of moves
+                if not len(legal) or (len(legal) < size and rng.random() < 0.1):
+                    action = size * size
+                    board.play(None, None)
+                else:
+                    action = int(legal[rng.randrange(len(legal))])
+                    board.play(*divmod(action, size))
+                moves.append(action)
+            recorded[str(size)].append(moves)
+    return recorded
+
+
+def replay(size, moves, every=None):
+    """
+    Play recorded moves on a new Board. Returns the final board, or with `every`,
+    copies of the board before every `every`-th move.
+    """
+    board = Board(size)
+    boards = []
+    for i, action in enumerate(moves):
+        if every and i % every == 0:
+            boards.append(board.copy())
+        if action == size * size:
+            board.play(None, None)
+        else:
+            board.play(*divmod(action, size))
+    return boards if every else board
+
+
+def sample_positions(size, games, every=10):
+    """Boards at every `every`-th move of the recorded games."""
+    return [board for moves in games for board in replay(size, moves, every)]
+
+
+# Each benchmark takes (size, recorded games) and returns a function running one
+# timed pass, which returns the number of operations it performed.
+
+def bench_place_stone(size, games):
+    def run():
+        ops = 0
+        for moves in games:
+            board = Board(size)
+            for action in moves:
+                if action == size * size:
+                    board.play(None, None)
+                else:
+                    board.place_stone(*divmod(action, size))
+                    ops += 1
+        return ops
+    return run
+
+
+def bench_calculate_score(size, games):
+    boards = sample_positions(size, games)
+
+    def run():
+        for board in boards:
+            board.score_cache = None  # Time the scoring, not the cache
+            board.calculate_score()
+        return len(boards)
+    return run
+
+
+def bench_is_ko(size, games):
+    # Long games: the last position of each recorded game, with its whole history seen
+    boards = [replay(size, moves) for moves in games]
+    keys = [[position.hash for position in replay(size, moves, every=7)] for moves in games]
+
+    def run():
+        ops = 0
+        for board, hashes in zip(boards, keys):
+            for position_hash in hashes:
+                board.is_ko(position_hash, 1)
+                board.is_ko(position_hash, 2)
+            ops += 2 * len(hashes)
+        return ops
+    return run
+
+
+def bench_legal_moves(size, games):
+    boards = sample_positions(size, games)
+
+    def run():
+        for board in boards:
+            board.legal_moves()
+        return len(boards)
+    return run
+
+
+def bench_score_moves(size, games):
+    states = [board.get_board_state() for board in sample_positions(size, games)]
+
+    def run():
+        for state in states:
+            score_moves(state)
+        return len(states)
+    return run
+
+
+def bench_env_reset(size, games):
+    from ml.go_env import GoEnv
+    env = GoEnv(size)
+
+    def run():
+        for _ in range(100):
+            env.reset()
+        return 100
+    return run
+
+
+def bench_env_step(size, games):
+    from ml.go_env import GoEnv
+    env = GoEnv(size, allow_pass=True)
+
+    def run():
+        ops = 0
+        for moves in games:
+            env.reset()
+            for action in moves:
+                _, _, done, _ = env.step(action)
+                ops += 1
+                if done:
+                    break
+        return ops
+    return run
+
+
+def bench_model_predict(size, games):
+    from ml.model import GoAIModel
+    model = GoAIModel(board_size=size)  # predict needs no network
+    states = [board.get_board_state() for board in sample_positions(size, games)]
+
+    def run():
+        for state in states:
+            model.predict(state)
+        return len(states)
+    return run
+
+
+def bench_bc_train(size, games):
+    """Behavior cloning on the recorded games; one operation is one training sample."""
+    from imitation.algorithms.bc import BC
+    from stable_baselines3 import PPO
+    from ml.go_env import GoEnv
+
+    boards = sample_positions(size, games, every=1)
+    legal = [(board, np.flatnonzero(board.legal_moves().T.ravel())) for board in boards]
+    obs = np.array([board.get_board_state() for board, moves in legal if len(moves)])
+    acts = np.array([moves[0] for board, moves in legal if len(moves)])
+    batch_size = 64
+    batches = [{"obs": obs[i:i + batch_size], "acts": acts[i:i + batch_size]}
+               for i in range(0, len(acts) - batch_size + 1, batch_size)]
+    model = PPO("MlpPolicy", GoEnv(size), seed=0)
+    trainer = BC(observation_space=model.policy.observation_space, action_space=model.policy.action_space,
+                 demonstrations=batches, batch_size=batch_size, policy=model.policy, rng=np.random.default_rng(0))
+
+    def run():
+        trainer.train(n_epochs=1, progress_bar=False, log_interval=10 ** 9)
+        return len(batches) * batch_size
+    return run
+
+
+BENCHMARKS = {
+    "board.place_stone": bench_place_stone,
+    "board.calculate_score": bench_calculate_score,
+    "board.is_ko": bench_is_ko,
+    "board.legal_moves": bench_legal_moves,
+    "heuristics.score_moves": bench_score_moves,
+    "env.reset": bench_env_reset,
+    "env.step": bench_env_step,
+    "model.predict": bench_model_predict,
+    "bc.train_sample": bench_bc_train,
+}
+
+
+def measure(run, repeat):
+    """Microseconds per operation of each of `repeat` timed passes, after one warm-up pass."""
+    run()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ops = run()
+        timings.append((time.perf_counter() - start) * 1e6 / max(ops, 1))
+    return timings, ops
+
+
+def metadata(seed):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(POSITIONS_PATH)).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "seed": seed,
+    }
+
+
+def run_suite(names, sizes, repeat, seed):
+    with open(POSITIONS_PATH) as f:
+        recorded = json.load(f)
+    random.seed(seed)
+    np.random.seed(seed)
+    results, skipped = {}, {}
+    print(f"{'benchmark':<30} {'median us/op':>13} {'min us/op':>10} {'ops':>8}")
+    for name in names:
+        for size in sizes:
+            key = f"{name}/{size}x{size}"
+            try:
+                run = BENCHMARKS[name](size, recorded[str(size)])
+            except ImportError as error:
+                skipped[key] = f"missing dependency: {error.name}"
+                print(f"{key:<30} skipped ({skipped[key]})")
+                continue
+            timings, ops = measure(run, repeat)
+            results[key] = {"unit": "us/op", "median": statistics.median(timings), "min": min(timings),
+                            "ops": ops, "runs": timings}
+            print(f"{key:<30} {results[key]['median']:>13.2f} {results[key]['min']:>10.2f} {ops:>8}")
+    return {"meta": metadata(seed), "results": results, "skipped": skipped}
+
+
+def compare(before_path, after_path, threshold, stat="min"):
+    """Print the change of every benchmark in both runs. Returns the number of regressions."""
+    with open(before_path) as f:
+        before = json.load(f)["results"]
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+    regressions = 0
+    print(f"{'benchmark':<30} {'before':>10} {'after':>10} {'change':>8}")
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key][stat], after[key][stat]
+        change = new / old - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{key:<30} {old:>10.2f} {new:>10.2f} {change:>+7.1%}{flag}")
+    for key in sorted(set(before) ^ set(after)):
+        print(f"{key:<30} only in {'the first' if key in before else 'the second'} run")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--benchmarks", nargs="+", default=list(BENCHMARKS), choices=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=5, help="timed passes per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", action="store_true", help="record new games into positions.json first")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown counted as a regression")
+    parser.add_argument("--stat", choices=["min", "median"], default="min",
+                        help="statistic compared; the minimum is the least affected by other load on the machine")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, args.threshold, args.stat)
+        print(f"{regressions} regression(s) above {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+
+    if args.record or not os.path.exists(POSITIONS_PATH):
+        with open(POSITIONS_PATH, "w") as f:
+            json.dump(record_games(seed=args.seed), f)
+        print(f"Recorded games to {POSITIONS_PATH}")
+
+    report = run_suite(args.benchmarks, args.sizes, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
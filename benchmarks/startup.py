@@ -0,0 +1,103 @@
+"""
+Startup benchmark for the GUI: how long until the board is on screen and
+accepts clicks, and until the trained model has finished loading.
+
+Every run starts a fresh Python process, as launching the game does, which
+imports gui.board_gui, builds a GoGameGUI and draws its first frame. Times
+are measured from the start of the process, so they include the interpreter
+starting up:
+    startup.import_gui    gui.board_gui (and everything it imports) imported
+    startup.first_frame   window drawn and the event loop ready for input
+    startup.model_ready   the background model loading finished (GoGameGUI.model_ready)
+
+Run from the project root (a display is needed, e.g. xvfb-run on a server):
+    python benchmarks/startup.py --output startup.json
+Results use the format of benchmarks/run.py, so two runs compare with
+    python benchmarks/run.py --compare before.json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from benchmarks.run import metadata
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child process; prints one line per milestone as soon as it is reached
+CHILD = """
+import sys, time
+from gui.board_gui import GoGameGUI
+print("import_gui", flush=True)
+gui = GoGameGUI(board_size={size})
+gui.window.update()
+print("first_frame", flush=True)
+while {wait_model} and not gui.model_ready.is_set():
+    gui.window.update()
+    time.sleep(0.005)
+print("model_ready", gui.model_status, flush=True)
+gui.close()
+"""
+
+
+def start_once(size, wait_model):
+    """Launch the GUI in a new process. Returns milliseconds from launch to each milestone, and the model status."""
+    code = CHILD.format(size=size, wait_model=wait_model)
+    start = time.perf_counter()
+    child = subprocess.Popen([sys.executable, "-c", code], cwd=ROOT, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, text=True)
+    milestones, status = {}, None
+    for line in child.stdout:
+        name, *rest = line.split()
+        milestones[name] = (time.perf_counter() - start) * 1000
+        if rest:
+            status = rest[0]
+    _, errors = child.communicate()
+    if child.returncode:
+        raise RuntimeError(errors.strip().splitlines()[-1] if errors.strip() else f"exit status {child.returncode}")
+    if not wait_model:
+        milestones.pop("model_ready", None)
+    return milestones, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--size", type=int, default=9)
+    parser.add_argument("--repeat", type=int, default=5, help="processes started")
+    parser.add_argument("--no-model", action="store_true", help="stop at the first frame, without waiting for the model")
+    args = parser.parse_args()
+
+    runs, statuses, skipped = {}, set(), {}
+    try:
+        start_once(args.size, False)  # Warm-up: fills the OS file cache, as on a machine that ran the game before
+        for _ in range(args.repeat):
+            milestones, status = start_once(args.size, not args.no_model)
+            statuses.add(status)
+            for name, ms in milestones.items():
+                runs.setdefault(f"startup.{name}/{args.size}x{args.size}", []).append(ms)
+    except RuntimeError as error:
+        skipped[f"startup/{args.size}x{args.size}"] = str(error)
+        print(f"Could not start the GUI: {error}")
+
+    results = {key: {"unit": "ms", "median": statistics.median(timings), "min": min(timings), "runs": timings}
+               for key, timings in runs.items()}
+    print(f"{'milestone':<30} {'median ms':>10} {'min ms':>10}")
+    for key, result in results.items():
+        print(f"{key:<30} {result['median']:>10.1f} {result['min']:>10.1f}")
+    if statuses - {None}:
+        print(f"Model status: {', '.join(sorted(statuses - {None}))}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": metadata(None), "results": results, "skipped": skipped}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
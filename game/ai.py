@@ -1,5 +1,13 @@
+import heapq
+import itertools
+import math
+import random
+import time
+
 import numpy as np
 
+from game.playout import PlayoutBoard
+
 class GoAI:
     def __init__(self, board_size=9):
         self.board_size = board_size
@@ -10,3 +18,272 @@ class GoAI:
         if len(empty_positions) == 0:
             return None  # No moves available
         return empty_positions[np.random.choice(len(empty_positions))]
+
+
+def trailing_passes(board):
+    """Count the passes (at most two) at the end of a Board's move history."""
+    passes = 0
+    for record in reversed(board.undo_stack[-2:]):
+        if record[0] is not None:
+            break
+        passes += 1
+    return passes
+
+
+def final_value(board, komi=0):
+    """
+    Return +1/-1/0 for a win/loss/draw of the player to move, scoring the board as it
+    stands by area (Board.area_score), like the playouts of RolloutEvaluator.
+    """
+    black_score, white_score = board.area_score()
+    margin = black_score - white_score - komi
+    if board.current_player == 2:
+        margin = -margin
+    return float(np.sign(margin))
+
+
+class RolloutEvaluator:
+    """
+    Search evaluator without a neural network: uniform priors and the result of one random playout.
+    The playout runs on a PlayoutBoard copy of the position and is scored by area, minus komi.
+    """
+
+    def __init__(self, max_moves=None, komi=0, seed=None):
+        self.max_moves = max_moves
+        self.komi = komi
+        self.rng = random.Random(seed)
+
+    def __call__(self, board):
+        playout = PlayoutBoard.from_board(board)
+        playout.rng = self.rng
+        playout.playout(self.max_moves)
+        black_score, white_score = playout.score()
+        margin = black_score - white_score - self.komi
+        if board.current_player == 2:
+            margin = -margin
+        return None, float(np.sign(margin))
+
+
+class MCTSNode:
+    """
+    A search tree node. Edge statistics live in small NumPy arrays indexed like
+    moves, and children are only created for the edges that have been visited.
+    """
+    __slots__ = ("moves", "priors", "visits", "value_sums", "children", "passes")
+
+    def __init__(self, moves, priors, passes):
+        self.moves = moves  # Legal actions (x * size + y, size * size for pass)
+        self.priors = priors
+        self.visits = np.zeros(len(moves), dtype=np.int32)
+        self.value_sums = np.zeros(len(moves), dtype=np.float32)  # From the view of the player to move
+        self.children = {}  # Edge index -> MCTSNode
+        self.passes = passes  # Consecutive passes that led to this node
+
+    def count(self):
+        """Number of nodes in this subtree."""
+        return 1 + sum(child.count() for child in self.children.values())
+
+
+class MCTS:
+    """
+    Monte Carlo Tree Search player on top of game.board.Board.
+
+    The search plays and undoes moves on the board it is given, so it never
+    copies positions. Leaves are scored by an evaluator: a callable taking the
+    board and returning (priors, value), where priors is an array over all
+    actions (x * size + y, plus size * size for pass) or None for uniform, and
+    value in [-1, 1] is seen from the player to move. RolloutEvaluator is used
+    when none is given; GoAIModel.evaluate_position plugs in a trained policy, and
+    GoAIModel.cached_evaluator() does the same without re-evaluating positions.
+    Positions where both players passed are scored by area, minus komi, as the
+    rollouts are, so the whole search plays for one rule.
+
+    The search stops at whichever budget comes first: visits, seconds, or
+    nodes held in memory. The subtree below the moves actually played is kept
+    for the next search.
+    """
+
+    def __init__(self, board_size=9, evaluator=None, selection="puct", c_puct=1.5,
+                 max_visits=800, max_time=None, max_nodes=200000, komi=0, seed=None):
+        if selection not in ("puct", "uct"):
+            raise ValueError(f"Unknown selection rule: {selection}")
+        self.board_size = board_size
+        self.evaluator = evaluator if evaluator is not None else RolloutEvaluator(komi=komi, seed=seed)
+        self.selection = selection
+        self.c_puct = c_puct
+        self.max_visits = max_visits
+        self.max_time = max_time
+        self.max_nodes = max_nodes
+        self.komi = komi
+        self.root = None
+        self.root_key = None  # Position the root belongs to
+        self.node_count = 0
+
+    def reset(self):
+        """Forget the search tree."""
+        self.root = None
+        self.root_key = None
+        self.node_count = 0
+
+    def suggest_move(self, board):
+        """Search the position and return the best move as (x, y), or None to pass."""
+        self.search(board)
+        return self.best_move()
+
+    def search(self, board, max_visits=None, max_time=None, stop_event=None):
+        """
+        Run simulations from the board position until a budget runs out or stop_event is set.
+        Visits already stored in a reused subtree count towards max_visits. Returns the root node.
+        """
+        max_visits = max_visits if max_visits is not None else self.max_visits
+        max_time = max_time if max_time is not None else self.max_time
+        deadline = time.perf_counter() + max_time if max_time is not None else None
+
+        # Reuse the tree if it belongs to this position (a root reached through advance() is trusted)
+        key = self._key(board)
+        if self.root is None or self.root_key not in (key, None):
+            self.root = self._expand(board, trailing_passes(board))[0]
+            self.node_count = 1
+        self.root_key = key
+
+        while self.root.visits.sum() < max_visits:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if stop_event is not None and stop_event.is_set():
+                break
+            self._simulate(board)
+        return self.root
+
+    def best_move(self):
+        """The most visited move at the root as (x, y), or None for pass."""
+        if self.root is None or not len(self.root.moves):
+            return None
+        return self._to_xy(self.root.moves[int(np.argmax(self.root.visits))])
+
+    def visit_counts(self):
+        """Map each root move, as (x, y) or None, to its visit count."""
+        if self.root is None:
+            return {}
+        return {self._to_xy(move): int(visits) for move, visits in zip(self.root.moves, self.root.visits)}
+
+    def advance(self, move):
+        """Move the root to the child for a played move ((x, y) or None), keeping its subtree."""
+        if self.root is None:
+            return
+        action = self._to_action(move)
+        index = np.flatnonzero(self.root.moves == action)
+        child = self.root.children.get(int(index[0])) if len(index) else None
+        if child is None:
+            self.reset()
+            return
+        self.root = child
+        self.root_key = None  # The next searched board is assumed to be the position after move
+        self.node_count = child.count()
+
+    def prune(self, max_nodes):
+        """
+        Shrink the tree to at most max_nodes nodes, keeping the most visited lines:
+        nodes are kept in order of the visits of the edge leading to them. Edge
+        statistics stay with the parents, so a dropped child is expanded again if
+        the search comes back to it.
+        """
+        if self.root is None or self.node_count <= max_nodes:
+            return
+        order = itertools.count()  # Breaks ties between equally visited edges
+        edges = []
+
+        def push(node):
+            for index in node.children:
+                heapq.heappush(edges, (-int(node.visits[index]), next(order), node, index))
+
+        push(self.root)
+        kept = 1
+        while edges:
+            _, _, node, index = heapq.heappop(edges)
+            if kept < max_nodes:
+                kept += 1
+                push(node.children[index])
+            else:
+                del node.children[index]  # Its subtree goes with it
+        self.node_count = kept
+
+    def _key(self, board):
+        return board.hash, board.current_player, board.ko_point
+
+    def _to_xy(self, action):
+        if action == self.board_size * self.board_size:
+            return None
+        x, y = divmod(int(action), self.board_size)
+        return x, y
+
+    def _to_action(self, move):
+        if move is None:
+            return self.board_size * self.board_size
+        x, y = move
+        return x * self.board_size + y
+
+    def _simulate(self, board):
+        """Run one selection / expansion / evaluation / backup pass."""
+        node = self.root
+        path = []
+        value = None
+        while True:
+            index = self._select(node)
+            path.append((node, index))
+            move = self._to_xy(node.moves[index])
+            if move is None:
+                board.play(None, None)
+                passes = node.passes + 1
+            else:
+                board.play(*move)
+                passes = 0
+
+            child = node.children.get(index)
+            if child is not None:
+                node = child
+                continue
+            if passes >= 2:
+                value = final_value(board, self.komi)  # Both players passed: the game is over
+            elif self.node_count < self.max_nodes:
+                child, value = self._expand(board, passes)
+                node.children[index] = child
+                self.node_count += 1
+            else:
+                value = self.evaluator(board)[1]  # Out of memory budget: evaluate without storing
+            break
+
+        for _ in path:
+            board.undo()
+
+        # The value is seen from the player to move at the leaf; flip it at every ply going up
+        for node, index in reversed(path):
+            value = -value
+            node.visits[index] += 1
+            node.value_sums[index] += value
+
+    def _select(self, node):
+        visits = node.visits
+        total = visits.sum()
+        q = np.divide(node.value_sums, visits, out=np.zeros(len(visits), dtype=np.float32), where=visits > 0)
+        if self.selection == "puct":
+            scores = q + self.c_puct * node.priors * math.sqrt(total + 1) / (1 + visits)
+        else:
+            unvisited = visits == 0
+            if unvisited.any():
+                return int(np.flatnonzero(unvisited)[0])
+            scores = q + self.c_puct * np.sqrt(math.log(total) / visits)
+        return int(np.argmax(scores))
+
+    def _expand(self, board, passes):
+        """Create the node for the board position. Returns (node, value of the position)."""
+        # legal_moves is indexed [y, x]; transpose so the flat index is the action x * size + y
+        legal = np.flatnonzero(board.legal_moves().T.ravel())
+        moves = np.append(legal, self.board_size * self.board_size).astype(np.int16)
+        priors, value = self.evaluator(board)
+        if priors is None:
+            move_priors = np.full(len(moves), 1.0 / len(moves), dtype=np.float32)
+        else:
+            move_priors = np.asarray(priors, dtype=np.float32)[moves]
+            move_priors += 1e-3  # Keep every legal move (pass included) reachable
+            move_priors /= move_priors.sum()
+        return MCTSNode(moves, move_priors, passes), value
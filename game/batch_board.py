@@ -0,0 +1,134 @@
+import numpy as np
+
+from game.vector_ops import dilate, flood, liberty_counts, neighbor_views, territory
+
+
+class BatchBoard:
+    """
+    N independent Go games stored as one (N, size, size) int8 array.
+
+    Every rule is applied to all games at once with array operations, so the
+    per-move cost is dominated by a handful of NumPy calls instead of Python
+    loops over points. Points are addressed by their flat index y * size + x.
+
+    Unlike game.board.Board, only the simple ko rule is enforced (no superko):
+    tracking every past position of every game would defeat the purpose.
+    """
+
+    def __init__(self, num_games, size=9):
+        self.num_games = num_games
+        self.size = size
+        self.boards = np.zeros((num_games, size, size), dtype=np.int8)  # 0: empty, 1: black, 2: white
+        self.current_player = np.ones(num_games, dtype=np.int8)  # Black starts
+        self.captured_black = np.zeros(num_games, dtype=np.int32)  # Captured black stones by White
+        self.captured_white = np.zeros(num_games, dtype=np.int32)  # Captured white stones by Black
+        self.ko_point = np.full(num_games, -1, dtype=np.int32)  # Simple ko point, -1 if none
+
+    def reset(self, games=None):
+        """Reset the given games (all of them by default) to an empty board."""
+        if games is None:
+            games = slice(None)
+        self.boards[games] = 0
+        self.current_player[games] = 1
+        self.captured_black[games] = 0
+        self.captured_white[games] = 0
+        self.ko_point[games] = -1
+
+    def place_stones(self, points):
+        """
+        Play one move in every game: a flat point index, or -1 to leave that game untouched.
+        Returns a boolean array telling which games accepted their move.
+        Games whose move is illegal are left unchanged.
+        """
+        points = np.asarray(points)
+        games = np.arange(self.num_games)
+        playing = points >= 0
+        target = np.where(playing, points, 0)
+        flat = self.boards.reshape(self.num_games, -1)
+
+        legal = playing & (flat[games, target] == 0) & (target != self.ko_point)
+        color = self.current_player
+        candidate = self.boards.copy()
+        candidate.reshape(self.num_games, -1)[games[legal], target[legal]] = color[legal]
+
+        # Capture opponent groups left without liberties
+        own = candidate == color[:, None, None]
+        opponent = candidate == (3 - color)[:, None, None]
+        alive = flood(dilate(candidate == 0) & opponent, opponent)
+        captured = opponent & ~alive
+        candidate[captured] = 0
+
+        # Check for suicide rule (the new group has no liberties after captures)
+        empty = candidate == 0
+        own_alive = flood(dilate(empty) & own, own)
+        legal &= ~(own & ~own_alive).any(axis=(1, 2))
+
+        # Commit the legal moves
+        captured_count = captured.sum(axis=(1, 2))
+        self.boards[legal] = candidate[legal]
+        by_black = legal & (color == 1)
+        by_white = legal & (color == 2)
+        self.captured_white[by_black] += captured_count[by_black]
+        self.captured_black[by_white] += captured_count[by_white]
+
+        # A lone stone that captured a lone stone and is left in atari can be retaken at once
+        placed = np.zeros_like(own)
+        placed.reshape(self.num_games, -1)[games[legal], target[legal]] = True
+        ring = dilate(placed) & ~placed
+        lone = ~(ring & own).any(axis=(1, 2)) & ((ring & empty).sum(axis=(1, 2)) == 1)
+        ko = legal & (captured_count == 1) & lone
+        self.ko_point[legal] = -1
+        self.ko_point[ko] = captured.reshape(self.num_games, -1)[ko].argmax(axis=1)
+
+        self.current_player[legal] = 3 - self.current_player[legal]
+        return legal
+
+    def pass_turn(self, games):
+        """Pass for the current player in the given games (a boolean mask or indices)."""
+        self.current_player[games] = 3 - self.current_player[games]
+        self.ko_point[games] = -1
+
+    def legal_moves(self):
+        """Return an (N, size * size) boolean mask of the points each player to move may play."""
+        boards = self.boards
+        color = self.current_player[:, None, None]
+        libs = liberty_counts(boards)
+        neighbor_colors = neighbor_views(boards, fill=-1)
+        neighbor_libs = neighbor_views(libs)
+
+        # A move is legal when it keeps a liberty, joins a group with a spare liberty, or captures
+        breathes = np.zeros(boards.shape, dtype=bool)
+        for neighbor_color, neighbor_lib in zip(neighbor_colors, neighbor_libs):
+            breathes |= neighbor_color == 0
+            breathes |= (neighbor_color == color) & (neighbor_lib > 1)
+            breathes |= (neighbor_color == 3 - color) & (neighbor_lib == 1)
+        legal = ((boards == 0) & breathes).reshape(self.num_games, -1)
+
+        has_ko = self.ko_point >= 0
+        legal[np.flatnonzero(has_ko), self.ko_point[has_ko]] = False
+        return legal
+
+    def calculate_score(self, games=None):
+        """
+        Calculate (black_scores, white_scores) arrays with the same rules as Board.calculate_score,
+        for the given games (a boolean mask or indices) or all of them.
+        """
+        if games is None:
+            games = slice(None)
+        black_territory, white_territory = territory(self.boards[games])
+        black_score = black_territory.sum(axis=(1, 2)) + self.captured_white[games]
+        white_score = white_territory.sum(axis=(1, 2)) + self.captured_black[games]
+        return black_score, white_score
+
+    def estimate_score(self):
+        """
+        Cheaply estimate (black_scores, white_scores) like Board.estimate_score: the empty
+        points whose stone neighbors all have one color, plus captures. No flood fill,
+        so use calculate_score for the exact result at the end of a game.
+        """
+        empty = self.boards == 0
+        near_black = dilate(self.boards == 1)
+        near_white = dilate(self.boards == 2)
+        black_score = (empty & near_black & ~near_white).sum(axis=(1, 2)) + self.captured_white
+        white_score = (empty & near_white & ~near_black).sum(axis=(1, 2)) + self.captured_black
+        return black_score, white_score
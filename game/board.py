@@ -1,44 +1,348 @@
+import random
+from collections import deque
+
 import numpy as np
 
+from game.vector_ops import territory
+
+
+_NEIGHBOR_TABLES = {}
+_ZOBRIST_TABLES = {}
+
+# Hashed into the position key when White is to move (situational superko)
+ZOBRIST_WHITE_TO_MOVE = random.Random("white-to-move").getrandbits(64)
+
+
+def neighbor_table(size):
+    """Return the flat indices of the neighbors of every point, cached per board size."""
+    table = _NEIGHBOR_TABLES.get(size)
+    if table is None:
+        table = []
+        for point in range(size * size):
+            y, x = divmod(point, size)
+            neighbors = []
+            if x > 0:
+                neighbors.append(point - 1)
+            if x < size - 1:
+                neighbors.append(point + 1)
+            if y > 0:
+                neighbors.append(point - size)
+            if y < size - 1:
+                neighbors.append(point + size)
+            table.append(tuple(neighbors))
+        table = tuple(table)
+        _NEIGHBOR_TABLES[size] = table
+    return table
+
+
+def zobrist_table(size):
+    """Return per-point Zobrist keys indexed as table[point][color], cached per board size."""
+    table = _ZOBRIST_TABLES.get(size)
+    if table is None:
+        rng = random.Random(size)  # Fixed seed so hashes are reproducible across runs
+        table = tuple((0, rng.getrandbits(64), rng.getrandbits(64)) for _ in range(size * size))
+        _ZOBRIST_TABLES[size] = table
+    return table
+
+
+class Chain:
+    """A connected group of stones of one color and the set of its liberties."""
+    __slots__ = ("color", "stones", "liberties", "hash")
+
+    def __init__(self, color, stones, liberties, hash=0):
+        self.color = color
+        self.stones = stones  # Flat indices (y * size + x) of the stones
+        self.liberties = liberties  # Flat indices of the adjacent empty points
+        self.hash = hash  # XOR of the Zobrist keys of the stones
+
 
 class Board:
-    def __init__(self, size=9):
+    __slots__ = ("size", "superko", "keep_history", "board", "current_player", "captured_black",
+                 "captured_white", "previous_states", "neighbors", "zobrist", "chains", "hash",
+                 "seen_hashes", "ko_point", "undo_stack", "adjacent_stones", "estimate", "score_cache")
+
+    def __init__(self, size=9, superko="positional", keep_history=False):
+        """
+        superko: "positional" forbids repeating a board position, "situational"
+        only forbids repeating it with the same player to move.
+        keep_history: also keep a full copy of the board after every move in previous_states.
+        """
+        if superko not in ("positional", "situational"):
+            raise ValueError(f"Unknown superko rule: {superko}")
         self.size = size
+        self.superko = superko
+        self.keep_history = keep_history
         self.board = np.zeros((self.size, self.size), dtype=int)  # 0: empty, 1: black, 2: white
         self.current_player = 1  # Black starts
         self.captured_black = 0  # Captured black stones by White
         self.captured_white = 0  # Captured white stones by Black
-        self.previous_states = []  # For enforcing the Ko rule
+        self.previous_states = []  # Board snapshots, only filled when keep_history is set
+        self.neighbors = neighbor_table(size)
+        self.zobrist = zobrist_table(size)
+        self.chains = [None] * (size * size)  # Chain occupying each point, None if empty
+        self.hash = 0  # Zobrist hash of the stones on the board
+        self.seen_hashes = set()  # Position keys played so far, for enforcing the Ko rule
+        self.ko_point = None  # Point that would immediately retake a single-stone ko
+        self.undo_stack = []  # One record per move, consumed by undo()
+        self.adjacent_stones = (None, [0] * (size * size), [0] * (size * size))  # Black/white neighbor counts
+        self.estimate = [size * size, 0, 0]  # Points owned by nobody, black and white, see estimate_score
+        self.score_cache = None  # (hash, captures, score) of the last exact score
 
     def place_stone(self, x, y):
         """Attempt to place a stone. Returns True if successful."""
-        if self.board[y][x] != 0:  # Position already occupied
+        move = self._check_move(x, y)
+        if move is None:
             return False
 
-        # Temporarily place the stone
-        self.board[y][x] = self.current_player
+        # Place the stone and remove the opponent chains it leaves without liberties
+        point = y * self.size + x
+        color = self.current_player
+        own_chains, enemy_chains, empty_neighbors = move
+        record = (point, color, own_chains, enemy_chains, self.captured_black, self.captured_white, self.hash, self.ko_point)
+        added_liberties = self._add_stone(point, color, own_chains, enemy_chains, empty_neighbors)
+        captured = [chain for chain in enemy_chains if not chain.liberties]
+        self.capture_stones(x, y)
 
-        # Check if it captures opponent stones
-        captured_any = self.capture_stones(x, y)
-
-        # Check for suicide rule (no liberties after placement)
-        group = self.get_group(x, y)
-        if not captured_any and not self.has_liberties(group):
-            self.board[y][x] = 0  # Undo the move
-            return False
-
-        # Prevent Ko: Check if this move repeats a previous board state
-        if self.is_ko():
-            self.board[y][x] = 0
-            return False
-
-        # Save the current state for Ko rule enforcement
-        self.previous_states.append(self.board.copy())
+        # A lone stone that captured a lone stone and is left in atari can be retaken at once
+        chain = self.chains[point]
+        if len(captured) == 1 and len(captured[0].stones) == 1 and len(chain.stones) == 1 and len(chain.liberties) == 1:
+            self.ko_point = next(iter(captured[0].stones))
+        else:
+            self.ko_point = None
 
         # Switch player
         self.current_player = 3 - self.current_player
+
+        # Save the current position for Ko rule enforcement
+        self.seen_hashes.add(self.position_key())
+        if self.keep_history:
+            self.previous_states.append(self.board.copy())
+        self.undo_stack.append(record + (added_liberties, captured))
         return True
 
+    def play(self, x, y):
+        """Play a stone at (x, y), or pass when x is None. Returns True if successful."""
+        if x is None:
+            self.undo_stack.append((None, self.current_player, self.ko_point))
+            self.ko_point = None
+            self.current_player = 3 - self.current_player
+            return True
+        return self.place_stone(x, y)
+
+    def undo(self):
+        """Take back the last move made with play or place_stone."""
+        record = self.undo_stack.pop()
+        if record[0] is None:  # Pass
+            _, self.current_player, self.ko_point = record
+            return
+
+        (point, color, own_chains, enemy_chains, captured_black, captured_white,
+         position_hash, ko_point, added_liberties, captured) = record
+        self.seen_hashes.discard(self.position_key())
+        if self.keep_history:
+            self.previous_states.pop()
+
+        # Put the captured chains back, taking their points away as liberties of their neighbors
+        for chain in captured:
+            for stone in chain.stones:
+                self.chains[stone] = chain
+                self._set_point(stone, chain.color)
+            for stone in chain.stones:
+                for neighbor in self.neighbors[stone]:
+                    adjacent = self.chains[neighbor]
+                    if adjacent is not None and adjacent is not chain:
+                        adjacent.liberties.discard(stone)
+        for enemy in enemy_chains:
+            enemy.liberties.add(point)
+
+        # Split the merged chain back into the chains it was built from
+        chain = self.chains[point]
+        self.chains[point] = None
+        self._set_point(point, 0)
+        if own_chains:
+            chain.stones.discard(point)
+            chain.liberties -= added_liberties
+            chain.liberties.add(point)
+            chain.hash ^= self.zobrist[point][color]
+            for other in own_chains:
+                if other is not chain:
+                    chain.stones -= other.stones
+                    chain.hash ^= other.hash
+                    for stone in other.stones:
+                        self.chains[stone] = other
+
+        self.captured_black = captured_black
+        self.captured_white = captured_white
+        self.hash = position_hash
+        self.ko_point = ko_point
+        self.current_player = color
+
+    def copy(self):
+        """
+        Return an independent copy of the board. Of its undo history only the passes
+        it ends with are kept: whether a pass ends the game depends on them (see
+        game.ai.trailing_passes), and the copy can undo them but nothing before.
+        """
+        board = Board(self.size, self.superko, self.keep_history)
+        board.board = self.board.copy()
+        board.current_player = self.current_player
+        board.captured_black = self.captured_black
+        board.captured_white = self.captured_white
+        board.previous_states = list(self.previous_states)
+        board.hash = self.hash
+        board.seen_hashes = set(self.seen_hashes)
+        board.ko_point = self.ko_point
+        board.adjacent_stones = (None, list(self.adjacent_stones[1]), list(self.adjacent_stones[2]))
+        board.estimate = list(self.estimate)
+        board.score_cache = self.score_cache
+        for record in reversed(self.undo_stack[-2:]):
+            if record[0] is not None:
+                break
+            board.undo_stack.insert(0, record)
+        copies = {}
+        for point, chain in enumerate(self.chains):
+            if chain is not None:
+                if chain not in copies:
+                    copies[chain] = Chain(chain.color, set(chain.stones), set(chain.liberties), chain.hash)
+                board.chains[point] = copies[chain]
+        return board
+
+    def is_legal(self, x, y):
+        """Check if the current player may place a stone at (x, y)."""
+        return self._check_move(x, y) is not None
+
+    def _check_move(self, x, y):
+        """Validate a move for the current player. Returns its adjacent chains, or None if illegal."""
+        if self.board[y][x] != 0:  # Position already occupied
+            return None
+
+        point = y * self.size + x
+        if point == self.ko_point:
+            return None
+        color = self.current_player
+        own_chains, enemy_chains, empty_neighbors = self._adjacent(point, color)
+        captured = [chain for chain in enemy_chains if len(chain.liberties) == 1]
+
+        # Check for suicide rule (no liberties after placement and nothing captured)
+        if not captured and not empty_neighbors and all(len(chain.liberties) == 1 for chain in own_chains):
+            return None
+
+        # Prevent Ko: Check if this move repeats a previous position
+        new_hash = self.hash ^ self.zobrist[point][color]
+        for chain in captured:
+            new_hash ^= chain.hash
+        if self.is_ko(new_hash, 3 - color):
+            return None
+        return own_chains, enemy_chains, empty_neighbors
+
+    def legal_moves(self):
+        """Return a (size, size) boolean array marking the points the current player may play."""
+        legal = np.zeros((self.size, self.size), dtype=bool)
+        for point, chain in enumerate(self.chains):
+            if chain is None:
+                y, x = divmod(point, self.size)
+                legal[y, x] = self._check_move(x, y) is not None
+        return legal
+
+    def count_liberties(self, x, y):
+        """Return the number of liberties of the group at (x, y), or 0 for an empty point."""
+        chain = self.chains[y * self.size + x]
+        return len(chain.liberties) if chain is not None else 0
+
+    def is_in_atari(self, x, y):
+        """Check if the group at (x, y) has exactly one liberty left."""
+        return self.count_liberties(x, y) == 1
+
+    def _adjacent(self, point, color):
+        """Split the neighbors of an empty point into own chains, enemy chains and empty points."""
+        own_chains = []
+        enemy_chains = []
+        empty_neighbors = []
+        for neighbor in self.neighbors[point]:
+            chain = self.chains[neighbor]
+            if chain is None:
+                empty_neighbors.append(neighbor)
+            elif chain.color == color:
+                if chain not in own_chains:
+                    own_chains.append(chain)
+            elif chain not in enemy_chains:
+                enemy_chains.append(chain)
+        return own_chains, enemy_chains, empty_neighbors
+
+    def _add_stone(self, point, color, own_chains, enemy_chains, empty_neighbors):
+        """
+        Put a stone on the board, merging it into the adjacent chains of its color.
+        Returns the liberties the merged chain gained, so that undo() can split it again.
+        """
+        if own_chains:
+            # Merge the smaller chains into the largest one to keep relabelling cheap
+            chain = max(own_chains, key=lambda own: len(own.stones))
+            added_liberties = set(empty_neighbors)
+            for other in own_chains:
+                if other is not chain:
+                    added_liberties |= other.liberties
+                    chain.stones |= other.stones
+                    chain.hash ^= other.hash
+                    for stone in other.stones:
+                        self.chains[stone] = chain
+            added_liberties -= chain.liberties
+            added_liberties.discard(point)
+            chain.stones.add(point)
+            chain.liberties |= added_liberties
+            chain.liberties.discard(point)
+            chain.hash ^= self.zobrist[point][color]
+        else:
+            added_liberties = None
+            chain = Chain(color, {point}, set(empty_neighbors), self.zobrist[point][color])
+        self.chains[point] = chain
+        self._set_point(point, color)
+        self.hash ^= self.zobrist[point][color]
+
+        for enemy in enemy_chains:
+            enemy.liberties.discard(point)
+        return added_liberties
+
+    def _set_point(self, point, color):
+        """Write one point of the board, keeping the running score estimate up to date."""
+        old = self.board.flat[point]
+        affected = (point,) + self.neighbors[point]
+        for other in affected:
+            self.estimate[self._point_owner(other)] -= 1
+        self.board.flat[point] = color
+        if old:
+            counts = self.adjacent_stones[old]
+            for neighbor in self.neighbors[point]:
+                counts[neighbor] -= 1
+        if color:
+            counts = self.adjacent_stones[color]
+            for neighbor in self.neighbors[point]:
+                counts[neighbor] += 1
+        for other in affected:
+            self.estimate[self._point_owner(other)] += 1
+
+    def _point_owner(self, point):
+        """Owner of a point for estimate_score: the only color among its neighbors if it is empty, else 0."""
+        if self.board.flat[point]:
+            return 0
+        black = self.adjacent_stones[1][point]
+        white = self.adjacent_stones[2][point]
+        if black and not white:
+            return 1
+        if white and not black:
+            return 2
+        return 0
+
+    def _remove_chain(self, chain):
+        """Take a chain off the board and give its points back as liberties to its neighbors."""
+        self.hash ^= chain.hash
+        for stone in chain.stones:
+            self.chains[stone] = None
+            self._set_point(stone, 0)
+        for stone in chain.stones:
+            for neighbor in self.neighbors[stone]:
+                adjacent = self.chains[neighbor]
+                if adjacent is not None:
+                    adjacent.liberties.add(stone)
 
     def get_board_state(self):
         """Return the current board state."""
@@ -46,7 +350,11 @@ class Board:
 
     def get_group(self, x, y):
         """Get the group of connected stones starting from (x, y)."""
-        color = self.board[y][x]
+        chain = self.chains[y * self.size + x]
+        if chain is not None:
+            return [(stone % self.size, stone // self.size) for stone in chain.stones]
+
+        # Empty point: flood fill the connected empty region
         visited = set()
         group = []
         stack = [(x, y)]
@@ -58,7 +366,7 @@ class Board:
                 group.append((cx, cy))
 
                 for nx, ny in self.get_neighbors(cx, cy):
-                    if self.board[ny][nx] == color:
+                    if self.board[ny][nx] == 0:
                         stack.append((nx, ny))
         return group
 
@@ -73,41 +381,48 @@ class Board:
     def capture_stones(self, x, y):
         """Check and capture opponent stones with no liberties."""
         opponent = 3 - self.current_player
-        captured = []
+        captured = 0
+
+        for neighbor in self.neighbors[y * self.size + x]:
+            chain = self.chains[neighbor]
+            if chain is not None and chain.color == opponent and not chain.liberties:
+                captured += len(chain.stones)
+                self._remove_chain(chain)
 
-        for nx, ny in self.get_neighbors(x, y):
-            if self.board[ny][nx] == opponent:
-                group = self.get_group(nx, ny)
-                if not self.has_liberties(group):
-                    captured.extend(group)
+        if opponent == 1:
+            self.captured_black += captured
+        else:
+            self.captured_white += captured
 
-        # Remove captured stones
-        for cx, cy in captured:
-            self.board[cy][cx] = 0
-            if opponent == 1:
-                self.captured_black += 1
-            else:
-                self.captured_white += 1
+        return captured > 0  # Return True if any stones were captured
 
-        return len(captured) > 0  # Return True if any stones were captured
 
+    def position_key(self, position_hash=None, player=None):
+        """Return the key compared by the superko rule, for the current position by default."""
+        if position_hash is None:
+            position_hash = self.hash
+        if player is None:
+            player = self.current_player
+        if self.superko == "situational" and player == 2:
+            return position_hash ^ ZOBRIST_WHITE_TO_MOVE
+        return position_hash
 
-    def is_ko(self):
-        """Check if the current board state repeats a previous state."""
-        return any(np.array_equal(self.board, state) for state in self.previous_states)
+    def is_ko(self, position_hash=None, player=None):
+        """Check if a position (the current one by default) repeats a previous position."""
+        return self.position_key(position_hash, player) in self.seen_hashes
 
     def get_territory(self, x, y):
         """Determine the owner of a territory starting at (x, y)."""
-        queue = [(x, y)]
+        queue = deque([(x, y)])
         visited = set()
-        territory = []
+        region = []
         borders = set()
 
         while queue:
-            cx, cy = queue.pop(0)
+            cx, cy = queue.popleft()
             if (cx, cy) not in visited:
                 visited.add((cx, cy))
-                territory.append((cx, cy))
+                region.append((cx, cy))
 
                 for nx, ny in self.get_neighbors(cx, cy):
                     if self.board[ny][nx] == 0:
@@ -120,41 +435,48 @@ class Board:
             owner = borders.pop()
         else:
             owner = 0  # Neutral territory
-        return territory, owner
+        return region, owner
 
     def calculate_score(self):
         """Calculate the score for both players."""
-        visited = set()
-        black_territory = 0
-        white_territory = 0
-
-        for y in range(self.size):
-            for x in range(self.size):
-                if (x, y) not in visited and self.board[y][x] == 0:
-                    territory, owner = self.get_territory(x, y)
-                    visited.update(territory)
-                    if owner == 1:
-                        black_territory += len(territory)
-                    elif owner == 2:
-                        white_territory += len(territory)
+        captures = (self.captured_black, self.captured_white)
+        if self.score_cache is not None and self.score_cache[:2] == (self.hash, captures):
+            return self.score_cache[2]
+
+        # An empty region is territory when every stone bordering it has the same color
+        black_territory, white_territory = territory(self.board)
 
         # Add captured stones to the score
-        black_score = black_territory + self.captured_white
-        white_score = white_territory + self.captured_black
+        black_score = int(black_territory.sum()) + self.captured_white
+        white_score = int(white_territory.sum()) + self.captured_black
+        self.score_cache = (self.hash, captures, (black_score, white_score))
+        return black_score, white_score
+
+    def area_score(self):
+        """
+        Area score for both players: their stones plus the empty regions bordered only
+        by them. Captures do not count. This is the rule PlayoutBoard.score applies at
+        the end of a playout, so the search scores finished games with it too.
+        """
+        black_territory, white_territory = territory(self.board)
+        black_score = int((self.board == 1).sum() + black_territory.sum())
+        white_score = int((self.board == 2).sum() + white_territory.sum())
+        return black_score, white_score
+
+    def estimate_score(self):
+        """
+        Cheaply estimate the score for both players, e.g. for reward shaping.
+        Counts the empty points whose stone neighbors all have one color, plus captures.
+        The counts are kept up to date as stones come and go, so this is O(1);
+        use calculate_score for the exact result at the end of a game.
+        """
+        black_score = self.estimate[1] + self.captured_white
+        white_score = self.estimate[2] + self.captured_black
         return black_score, white_score
 
     def get_neighbors(self, x, y):
         """Get all valid neighbors of a position (x, y)."""
-        neighbors = []
-        if x > 0:
-            neighbors.append((x - 1, y))
-        if x < self.size - 1:
-            neighbors.append((x + 1, y))
-        if y > 0:
-            neighbors.append((x, y - 1))
-        if y < self.size - 1:
-            neighbors.append((x, y + 1))
-        return neighbors
+        return [(n % self.size, n // self.size) for n in self.neighbors[y * self.size + x]]
 
     def reset_board(self):
         """Reset the board to its initial state."""
@@ -163,3 +485,11 @@ class Board:
         self.captured_black = 0
         self.captured_white = 0
         self.previous_states = []
+        self.chains = [None] * (self.size * self.size)
+        self.hash = 0
+        self.seen_hashes = set()
+        self.ko_point = None
+        self.undo_stack = []
+        self.adjacent_stones = (None, [0] * (self.size * self.size), [0] * (self.size * self.size))
+        self.estimate = [self.size * self.size, 0, 0]
+        self.score_cache = None
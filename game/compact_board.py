@@ -0,0 +1,221 @@
+import numpy as np
+
+from game.board import neighbor_table
+
+
+_MASKS = {}
+
+
+def board_masks(size):
+    """Return (full, not_first_column, not_last_column) bit masks, cached per board size."""
+    masks = _MASKS.get(size)
+    if masks is None:
+        full = (1 << (size * size)) - 1
+        first_column = 0
+        for y in range(size):
+            first_column |= 1 << (y * size)
+        last_column = first_column << (size - 1)
+        masks = (full, full & ~first_column, full & ~last_column)
+        _MASKS[size] = masks
+    return masks
+
+
+def popcount(bits):
+    """Count the set bits of a bitboard."""
+    return bin(bits).count("1")
+
+
+class CompactBoard:
+    """
+    Memory-compact Go board with the same public API as game.board.Board.
+
+    Each color is a bitboard stored in a Python int (bit y * size + x), so a
+    position costs a few dozen bytes instead of a 8-byte-per-point array plus
+    per-chain bookkeeping. Groups, liberties and territory are found by
+    dilating bitboards rather than by walking points one at a time.
+    """
+    __slots__ = ("size", "black", "white", "current_player", "captured_black",
+                 "captured_white", "ko_point", "seen", "neighbors", "masks")
+
+    def __init__(self, size=9, track_history=True):
+        """
+        track_history: remember every position for the superko rule. Without it
+        only immediate single-stone ko retakes are refused, and the board stays
+        a fixed, small size no matter how long the game is.
+        """
+        self.size = size
+        self.neighbors = neighbor_table(size)
+        self.masks = board_masks(size)
+        self.black = 0
+        self.white = 0
+        self.current_player = 1  # Black starts
+        self.captured_black = 0  # Captured black stones by White
+        self.captured_white = 0  # Captured white stones by Black
+        self.ko_point = None  # Point that would immediately retake a single-stone ko
+        self.seen = set() if track_history else None  # Position keys played so far
+
+    @classmethod
+    def from_board(cls, board, track_history=True):
+        """Build a compact copy of a game.board.Board (history is not carried over)."""
+        compact = cls(board.size, track_history)
+        state = board.get_board_state().ravel()
+        for point in np.flatnonzero(state == 1):
+            compact.black |= 1 << int(point)
+        for point in np.flatnonzero(state == 2):
+            compact.white |= 1 << int(point)
+        compact.current_player = board.current_player
+        compact.captured_black = board.captured_black
+        compact.captured_white = board.captured_white
+        compact.ko_point = board.ko_point
+        return compact
+
+    @property
+    def board(self):
+        """The position as a (size, size) int8 array, for code that reads Board.board."""
+        return self.get_board_state()
+
+    def copy(self):
+        """Return an independent copy of the board."""
+        board = CompactBoard(self.size, self.seen is not None)
+        board.black = self.black
+        board.white = self.white
+        board.current_player = self.current_player
+        board.captured_black = self.captured_black
+        board.captured_white = self.captured_white
+        board.ko_point = self.ko_point
+        if self.seen is not None:
+            board.seen = set(self.seen)
+        return board
+
+    def dilate(self, bits):
+        """Return the points of bits together with all of their neighbors."""
+        full, not_first, not_last = self.masks
+        return (bits
+                | ((bits << 1) & not_first)
+                | ((bits >> 1) & not_last)
+                | ((bits << self.size) & full)
+                | (bits >> self.size))
+
+    def group_bits(self, point, stones):
+        """Return the connected group of stones containing point."""
+        group = 1 << point
+        while True:
+            grown = self.dilate(group) & stones
+            if grown == group:
+                return group
+            group = grown
+
+    def place_stone(self, x, y):
+        """Attempt to place a stone. Returns True if successful."""
+        move = self._resolve_move(x, y)
+        if move is None:
+            return False
+        black, white, captured, key, ko_point = move
+
+        if self.seen is not None:
+            self.seen.add(key)
+        if self.current_player == 1:
+            self.captured_white += popcount(captured)
+        else:
+            self.captured_black += popcount(captured)
+        self.black, self.white = black, white
+        self.ko_point = ko_point
+        self.current_player = 3 - self.current_player
+        return True
+
+    def is_legal(self, x, y):
+        """Check if the current player may place a stone at (x, y)."""
+        return self._resolve_move(x, y) is not None
+
+    def _resolve_move(self, x, y):
+        """Work out the position after a move. Returns None if the move is illegal."""
+        point = int(y * self.size + x)  # Plain int: NumPy integers overflow when shifted
+        bit = 1 << point
+        if (self.black | self.white) & bit or point == self.ko_point:
+            return None
+
+        if self.current_player == 1:
+            own, opponent = self.black | bit, self.white
+        else:
+            own, opponent = self.white | bit, self.black
+        empty = self.masks[0] & ~(own | opponent)
+
+        # Capture opponent groups left without liberties
+        captured = 0
+        for neighbor in self.neighbors[point]:
+            neighbor_bit = 1 << neighbor
+            if opponent & neighbor_bit and not captured & neighbor_bit:
+                group = self.group_bits(neighbor, opponent)
+                if not self.dilate(group) & empty:
+                    captured |= group
+        if captured:
+            opponent &= ~captured
+            empty |= captured
+        else:
+            # Check for suicide rule (no liberties after placement)
+            group = self.group_bits(point, own)
+            if not self.dilate(group) & empty:
+                return None
+
+        # Prevent Ko: Check if this move repeats a previous position
+        black, white = (own, opponent) if self.current_player == 1 else (opponent, own)
+        key = hash((black, white))
+        if self.seen is not None and key in self.seen:
+            return None
+
+        # A lone stone that captured a lone stone and is left in atari can be retaken at once
+        ko_point = None
+        around = self.dilate(bit) & ~bit
+        if popcount(captured) == 1 and not own & around and popcount(around & empty) == 1:
+            ko_point = captured.bit_length() - 1
+        return black, white, captured, key, ko_point
+
+    def is_ko(self):
+        """Check if the current position repeats a previous position."""
+        return self.seen is not None and hash((self.black, self.white)) in self.seen
+
+    def get_board_state(self):
+        """Return the current board state."""
+        n = self.size * self.size
+        n_bytes = (n + 7) // 8
+        state = np.zeros(n, dtype=np.int8)
+        for bits, color in ((self.black, 1), (self.white, 2)):
+            packed = np.frombuffer(bits.to_bytes(n_bytes, "little"), dtype=np.uint8)
+            state[np.unpackbits(packed, bitorder="little")[:n].astype(bool)] = color
+        return state.reshape(self.size, self.size)
+
+    def territory_bits(self):
+        """Return bitboards of the empty points bordered only by black and only by white."""
+        empty = self.masks[0] & ~(self.black | self.white)
+        reach = []
+        for stones in (self.black, self.white):
+            region = self.dilate(stones) & empty
+            while True:
+                grown = self.dilate(region) & empty
+                if grown == region:
+                    break
+                region = grown
+            reach.append(region)
+        return reach[0] & ~reach[1], reach[1] & ~reach[0]
+
+    def calculate_score(self):
+        """Calculate the score for both players."""
+        black_territory, white_territory = self.territory_bits()
+        black_score = popcount(black_territory) + self.captured_white
+        white_score = popcount(white_territory) + self.captured_black
+        return black_score, white_score
+
+    def get_neighbors(self, x, y):
+        """Get all valid neighbors of a position (x, y)."""
+        return [(n % self.size, n // self.size) for n in self.neighbors[y * self.size + x]]
+
+    def reset_board(self):
+        """Reset the board to its initial state."""
+        self.black = 0
+        self.white = 0
+        self.current_player = 1
+        self.captured_black = 0
+        self.captured_white = 0
+        self.ko_point = None
+        if self.seen is not None:
+            self.seen = set()
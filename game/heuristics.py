@@ -0,0 +1,36 @@
+import numpy as np
+
+from game.vector_ops import liberty_counts, neighbor_views
+
+
+SELF_CAPTURE_PENALTY = -10
+
+
+def score_moves(state, player=2):
+    """
+    Score every point of a board state as a move for player, all at once.
+
+    The score is the one GoAIModel has always used: empty neighbors
+    (liberties) plus adjacent opponent stones the move would capture,
+    minus 10 if the new stone would be left without liberties. Returns a
+    float array indexed [y, x] with -inf on occupied points.
+    """
+    state = np.asarray(state)
+    opponent = 3 - player
+    group_libs = liberty_counts(state)
+    colors = neighbor_views(state, fill=-1)
+    libs = neighbor_views(group_libs)
+
+    liberties = np.zeros(state.shape, dtype=np.int32)
+    captures = np.zeros(state.shape, dtype=np.int32)
+    keeps_breathing = np.zeros(state.shape, dtype=bool)
+    for color, lib in zip(colors, libs):
+        liberties += color == 0
+        # An adjacent opponent group whose only liberty is this point is captured
+        captures += (color == opponent) & (lib == 1)
+        # The new stone keeps a liberty through an empty point or a friendly group with another liberty
+        keeps_breathing |= (color == 0) | ((color == player) & (lib > 1))
+
+    scores = (liberties + captures + np.where(keeps_breathing, 0, SELF_CAPTURE_PENALTY)).astype(float)
+    scores[state != 0] = -np.inf
+    return scores
@@ -0,0 +1,342 @@
+"""
+Counters, timing histograms and a sampling profiler for the hot paths.
+
+Nothing is measured until enable() is called: it wraps the probed functions
+(listed in PROBES) with timing code, and disable() puts the originals back, so
+instrumentation costs nothing while it is off. The same wrappers keep the
+counters listed in COUNTERS: moves generated and rejected, stones captured and
+superko repetitions found. For example:
+
+    from game import instrumentation
+    instrumentation.enable()
+    instrumentation.start_sampling()                   # Optional: where the time goes, by function
+    instrumentation.start_dump("profile.json", every=10)
+    ...
+    print(instrumentation.summary())
+
+Setting GO_INSTRUMENT=profile.json before running main.py does the same for
+the GUI (a .txt path writes the text summary instead).
+
+Updates are not locked: with several threads a few counts may be lost, which
+is fine for profiling and keeps each probe at about a microsecond.
+"""
+import collections
+import functools
+import importlib
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Probe name -> (module, class, method) that it times. Only methods can be probed: functions
+# imported by name elsewhere would keep pointing at the unwrapped original.
+PROBES = {
+    "board.place_stone": ("game.board", "Board", "place_stone"),
+    "board.check_move": ("game.board", "Board", "_check_move"),  # Move validation, used by move generation
+    "board.legal_moves": ("game.board", "Board", "legal_moves"),
+    "board.capture": ("game.board", "Board", "_remove_chain"),  # Capture resolution, once per captured chain
+    "board.calculate_score": ("game.board", "Board", "calculate_score"),
+    "board.is_ko": ("game.board", "Board", "is_ko"),
+    "mcts.search": ("game.ai", "MCTS", "search"),
+    "model.predict": ("ml.model", "GoAIModel", "predict"),
+    "model.evaluate_batch": ("ml.model", "GoAIModel", "evaluate_batch"),
+    "gui.draw_stones": ("gui.board_gui", "GoGameGUI", "draw_stones"),
+    "gui.choose_ai_move": ("gui.board_gui", "GoGameGUI", "choose_ai_move"),  # AI thinking, on its worker thread
+}
+
+# Probe name -> (counter, amount): while the probe is on, every call also adds amount(result, args) to the counter
+COUNTERS = {
+    "board.legal_moves": ("board.moves_generated", lambda legal, args: int(legal.sum())),
+    "board.check_move": ("board.moves_rejected", lambda move, args: move is None),  # Occupied, ko, suicide
+    "board.capture": ("board.stones_captured", lambda result, args: len(args[1].stones)),
+    "board.is_ko": ("board.superko_repetitions", lambda repeated, args: repeated),
+}
+
+
+class Histogram:
+    """Call count, total and a log2-bucketed distribution of durations in microseconds."""
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = collections.Counter()  # Bucket b holds durations in [2 ** (b - 1), 2 ** b) us
+
+    def add(self, microseconds):
+        self.count += 1
+        self.total += microseconds
+        if microseconds < self.min:
+            self.min = microseconds
+        if microseconds > self.max:
+            self.max = microseconds
+        self.buckets[int(microseconds).bit_length()] += 1
+
+    def percentile(self, percent):
+        """Upper bound of the bucket holding the given percentile."""
+        rank = self.count * percent / 100.0
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(float(2 ** bucket), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total / 1000.0,
+            "mean_us": self.total / self.count if self.count else 0.0,
+            "min_us": self.min if self.count else 0.0,
+            "p50_us": self.percentile(50),
+            "p90_us": self.percentile(90),
+            "p99_us": self.percentile(99),
+            "max_us": self.max,
+        }
+
+
+histograms = collections.defaultdict(Histogram)
+counters = collections.Counter()
+_patched = {}  # Probe name -> (owner, attribute, original)
+_sampler = None
+_dumper = None
+
+
+def count(name, n=1):
+    """Add to a named counter. The probes listed in COUNTERS count through this while they are on."""
+    counters[name] += n
+
+
+class timer:
+    """Context manager timing a block into the named histogram: with instrumentation.timer("name"): ..."""
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        histograms[self.name].add((time.perf_counter() - self.start) * 1e6)
+
+
+def _timed(name, function):
+    histogram = histograms[name]
+    clock = time.perf_counter
+    if name not in COUNTERS:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.add((clock() - start) * 1e6)
+        return wrapper
+
+    counter, amount = COUNTERS[name]
+
+    @functools.wraps(function)
+    def counting_wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            histogram.add((clock() - start) * 1e6)
+        count(counter, amount(result, args))
+        return result
+    return counting_wrapper
+
+
+def enable(probes=None):
+    """
+    Start timing the given probes (names from PROBES, all by default).
+    Probes whose module cannot be imported, e.g. without torch, are skipped.
+    Returns the names of the probes now active.
+    """
+    for name in probes if probes is not None else PROBES:
+        if name in _patched:
+            continue
+        module_name, class_name, attribute = PROBES[name]
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as error:
+            logger.info("Probe %s skipped: %s", name, error)
+            continue
+        owner = getattr(module, class_name)
+        original = owner.__dict__[attribute]
+        setattr(owner, attribute, _timed(name, original))
+        _patched[name] = (owner, attribute, original)
+    return sorted(_patched)
+
+
+def disable():
+    """Put the original functions back. The numbers collected so far are kept."""
+    for owner, attribute, original in _patched.values():
+        setattr(owner, attribute, original)
+    _patched.clear()
+
+
+def enabled():
+    return bool(_patched)
+
+
+def reset():
+    """Forget all counts, timings and samples."""
+    for histogram in histograms.values():
+        histogram.__init__()  # In place: the probes hold on to their histogram
+    counters.clear()
+    if _sampler is not None:
+        _sampler.samples.clear()
+        _sampler.inclusive.clear()
+        _sampler.total = 0
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    Looks at what the other threads are running every `interval` seconds and
+    counts the functions seen: on top of the stack (self time) and anywhere in it.
+    """
+
+    def __init__(self, interval=0.005):
+        super().__init__(name="sampling-profiler", daemon=True)
+        self.interval = interval
+        self.samples = collections.Counter()  # (file, line, function) on top of the stack
+        self.inclusive = collections.Counter()  # (file, function) anywhere in the stack
+        self.total = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or frame is None:
+                    continue
+                code = frame.f_code
+                self.samples[(code.co_filename, frame.f_lineno, code.co_name)] += 1
+                seen = set()
+                while frame is not None:
+                    key = (frame.f_code.co_filename, frame.f_code.co_name)
+                    if key not in seen:
+                        seen.add(key)
+                        self.inclusive[key] += 1
+                    frame = frame.f_back
+                self.total += 1
+
+    def top(self, n=15):
+        def share(counter):
+            return [{"where": ":".join(str(part) for part in key), "samples": samples,
+                     "percent": 100.0 * samples / self.total}
+                    for key, samples in counter.most_common(n)]
+        return {"samples": self.total, "self": share(self.samples), "inclusive": share(self.inclusive)}
+
+
+def start_sampling(interval=0.005):
+    """Start the sampling profiler (one per process)."""
+    global _sampler
+    if _sampler is None or not _sampler.is_alive():
+        _sampler = SamplingProfiler(interval)
+        _sampler.start()
+    return _sampler
+
+
+def stop_sampling():
+    global _sampler
+    if _sampler is not None:
+        _sampler.stopped.set()
+        _sampler.join()
+
+
+def snapshot():
+    """Everything measured so far, as a JSON-friendly dict."""
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "probes": sorted(_patched),
+        "timings": {name: histogram.to_dict() for name, histogram in sorted(histograms.items())},
+        "counters": dict(counters),
+    }
+    if _sampler is not None:
+        report["profile"] = _sampler.top()
+    return report
+
+
+def summary(report=None):
+    """A readable table of a snapshot (the current one by default)."""
+    report = report or snapshot()
+    lines = [f"{'probe':<26} {'calls':>9} {'total ms':>10} {'mean us':>9} {'p50 us':>8} {'p99 us':>8} {'max us':>9}"]
+    timings = sorted(report["timings"].items(), key=lambda item: -item[1]["total_ms"])
+    for name, timing in timings:
+        lines.append(f"{name:<26} {timing['count']:>9} {timing['total_ms']:>10.1f} {timing['mean_us']:>9.1f} "
+                     f"{timing['p50_us']:>8.0f} {timing['p99_us']:>8.0f} {timing['max_us']:>9.0f}")
+    for name, value in sorted(report["counters"].items()):
+        lines.append(f"{name:<26} {value:>9}")
+    profile = report.get("profile")
+    if profile and profile["samples"]:
+        lines.append(f"\nSampled {profile['samples']} stacks; most often running:")
+        for entry in profile["self"]:
+            lines.append(f"{entry['percent']:>6.1f}%  {entry['where']}")
+    return "\n".join(lines)
+
+
+def dump(path):
+    """Write a snapshot to path: JSON, or the text summary when the path ends in .txt."""
+    report = snapshot()
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        if path.endswith(".txt"):
+            f.write(summary(report) + "\n")
+        else:
+            json.dump(report, f, indent=2)
+    os.replace(temporary, path)
+
+
+class _Dumper(threading.Thread):
+    def __init__(self, path, every):
+        super().__init__(name="instrumentation-dump", daemon=True)
+        self.path = path
+        self.every = every
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.every):
+            dump(self.path)
+
+
+def start_dump(path, every=10.0):
+    """Write a snapshot to path every `every` seconds, on a background thread."""
+    global _dumper
+    stop_dump()
+    _dumper = _Dumper(path, every)
+    _dumper.start()
+
+
+def stop_dump():
+    """Stop the periodic dump, writing one last snapshot."""
+    global _dumper
+    if _dumper is not None:
+        _dumper.stopped.set()
+        _dumper.join()
+        dump(_dumper.path)
+        _dumper = None
+
+
+def from_environment(variable="GO_INSTRUMENT"):
+    """
+    Turn everything on when the environment variable names a dump file, e.g.
+    GO_INSTRUMENT=profile.json python main.py. Returns True if it did.
+    """
+    path = os.environ.get(variable)
+    if not path:
+        return False
+    enable()
+    start_sampling()
+    start_dump(path)
+    logger.info("Instrumentation on, writing to %s", path)
+    return True
@@ -0,0 +1,285 @@
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from game.ai import MCTS, RolloutEvaluator, final_value, trailing_passes
+
+# Locks guarding the edge statistics of the shared tree; node n uses lock n % LOCK_STRIPES
+LOCK_STRIPES = 64
+
+
+def _root_search(board, evaluator, options, max_visits, max_time, seed):
+    """Worker task for root parallelism: grow an independent tree and return its root statistics."""
+    if evaluator is None:
+        evaluator = RolloutEvaluator(komi=options["komi"], seed=seed)
+    search = MCTS(board.size, evaluator=evaluator, **options)
+    root = search.search(board, max_visits=max_visits, max_time=max_time)
+    return root.moves, root.visits, root.value_sums
+
+
+class SharedTree:
+    """
+    Search tree statistics laid out as fixed-size tables in shared memory, so
+    that several processes can grow one tree together. Node 0 is the root;
+    row n of each (max_nodes, n_actions) table holds the edges of node n.
+
+    Updates to a node's edges (visits, value sums, virtual loss, children) are
+    read-modify-writes from several processes and must hold the node's lock
+    (see _tree_search). Selection reads without it: a slightly stale count
+    only changes which move is tried, never the totals.
+    """
+
+    FIELDS = (
+        ("child", np.int32),  # Child node index per edge, -1 if not created
+        ("visits", np.int32),
+        ("value_sums", np.float32),
+        ("virtual_loss", np.int32),  # Simulations currently running through an edge
+        ("priors", np.float32),  # 0 for illegal moves
+    )
+
+    @classmethod
+    def nodes_for_memory(cls, megabytes, n_actions):
+        """How many nodes fit in the given amount of shared memory."""
+        node_bytes = sum(n_actions * np.dtype(dtype).itemsize for _, dtype in cls.FIELDS) + 2
+        return max(2, int(megabytes * 2 ** 20) // node_bytes)
+
+    def __init__(self, max_nodes, n_actions, name=None):
+        self.max_nodes = max_nodes
+        self.n_actions = n_actions
+        table_bytes = [max_nodes * n_actions * np.dtype(dtype).itemsize for _, dtype in self.FIELDS]
+        size = sum(table_bytes) + 2 * max_nodes  # Plus the ready and passes flags
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+
+        offset = 0
+        for (field, dtype), n_bytes in zip(self.FIELDS, table_bytes):
+            table = np.ndarray((max_nodes, n_actions), dtype=dtype, buffer=self.memory.buf, offset=offset)
+            setattr(self, field, table)
+            offset += n_bytes
+        self.ready = np.ndarray(max_nodes, dtype=np.uint8, buffer=self.memory.buf, offset=offset)
+        self.passes = np.ndarray(max_nodes, dtype=np.uint8, buffer=self.memory.buf, offset=offset + max_nodes)
+
+    def clear(self):
+        self.child.fill(-1)
+        self.visits.fill(0)
+        self.value_sums.fill(0)
+        self.virtual_loss.fill(0)
+        self.priors.fill(0)
+        self.ready.fill(0)
+        self.passes.fill(0)
+
+    def close(self):
+        for field, _ in self.FIELDS:
+            setattr(self, field, None)
+        self.ready = self.passes = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def expand_shared(tree, node, board, evaluator, passes):
+    """Fill in the edges of a shared tree node for the board position. Returns the position's value."""
+    priors, value = evaluator(board)
+    legal = np.append(board.legal_moves().T.ravel(), True)  # Pass is always legal
+    if priors is None:
+        node_priors = legal.astype(np.float32)
+    else:
+        node_priors = (np.asarray(priors, dtype=np.float32) + 1e-3) * legal
+    tree.priors[node] = node_priors / node_priors.sum()
+    tree.passes[node] = passes
+    tree.ready[node] = 1  # Published last: other workers only descend into ready nodes
+    return value
+
+
+_tree = None  # The SharedTree each pool process attached to
+_locks = None  # Its lock stripes
+
+
+def _attach_tree(name, max_nodes, n_actions, locks):
+    global _tree, _locks
+    _tree = SharedTree(max_nodes, n_actions, name=name)
+    _locks = locks
+
+
+def _tree_search(board, evaluator, options, node_range, max_visits, max_time, seed):
+    """
+    Worker task for tree parallelism: run simulations on the shared tree until the budget runs out.
+    New nodes come from this worker's own slice of the node table; linking one into the tree
+    and every statistics update hold the lock of the node whose edge changes.
+    Returns the number of simulations run.
+    """
+    tree = _tree
+    locks = _locks
+    if evaluator is None:
+        evaluator = RolloutEvaluator(komi=options["komi"], seed=seed)
+    pass_action = board.size * board.size
+    c_puct = options["c_puct"]
+    virtual_loss = options["virtual_loss"]
+    next_node, end_node = node_range
+    deadline = time.perf_counter() + max_time if max_time is not None else None
+    simulations = 0
+
+    while tree.visits[0].sum() < max_visits:
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        node = 0
+        path = []
+        while True:
+            # PUCT, counting the simulations in flight as losses to spread workers over the tree
+            in_flight = tree.virtual_loss[node] * virtual_loss
+            visits = tree.visits[node] + in_flight
+            q = np.divide(tree.value_sums[node] - in_flight, visits,
+                          out=np.zeros(tree.n_actions, dtype=np.float32), where=visits > 0)
+            scores = q + c_puct * tree.priors[node] * math.sqrt(visits.sum() + 1) / (1 + visits)
+            scores[tree.priors[node] == 0] = -np.inf
+            action = int(np.argmax(scores))
+            with locks[node % LOCK_STRIPES]:
+                tree.virtual_loss[node, action] += 1
+            path.append((node, action))
+
+            if action == pass_action:
+                board.play(None, None)
+                passes = tree.passes[node] + 1
+            else:
+                board.play(*divmod(action, board.size))
+                passes = 0
+
+            child = tree.child[node, action]
+            if child >= 0 and tree.ready[child]:
+                node = child
+                continue
+            if passes >= 2:
+                value = final_value(board, options["komi"])
+                break
+            claimed = False
+            if child < 0 and next_node < end_node:
+                with locks[node % LOCK_STRIPES]:
+                    if tree.child[node, action] < 0:  # Another worker may have linked one meanwhile
+                        child = next_node
+                        next_node += 1
+                        tree.child[node, action] = child
+                        claimed = True
+            if claimed:
+                value = expand_shared(tree, child, board, evaluator, passes)
+            else:
+                value = evaluator(board)[1]  # Being expanded elsewhere, or out of nodes
+            break
+
+        for _ in path:
+            board.undo()
+        for node, action in reversed(path):
+            value = -value
+            with locks[node % LOCK_STRIPES]:
+                tree.visits[node, action] += 1
+                tree.value_sums[node, action] += value
+                tree.virtual_loss[node, action] -= 1
+        simulations += 1
+    return simulations
+
+
+class ParallelMCTS:
+    """
+    Multi-process MCTS for game.board.Board with the same suggest_move interface as MCTS.
+
+    mode="root": every worker grows its own tree from the position and the
+    root visit counts are summed (root parallelism).
+    mode="tree": all workers grow one tree held in shared memory, using
+    virtual loss to keep them on different lines (tree parallelism).
+
+    Workers are kept in a process pool between moves; call close() when done.
+    The evaluator, if given, must be picklable. The tree is rebuilt for every
+    search: only the single-process MCTS reuses subtrees between moves.
+    """
+
+    def __init__(self, board_size=9, workers=4, mode="root", evaluator=None, c_puct=1.5,
+                 max_visits=800, max_time=None, max_memory_mb=64, virtual_loss=1, komi=0, seed=0):
+        if mode not in ("root", "tree"):
+            raise ValueError(f"Unknown parallel mode: {mode}")
+        self.board_size = board_size
+        self.workers = workers
+        self.mode = mode
+        self.evaluator = evaluator
+        self.c_puct = c_puct
+        self.max_visits = max_visits
+        self.max_time = max_time
+        self.virtual_loss = virtual_loss
+        self.komi = komi
+        self.seed = seed
+        self.tree = None
+        self.visits = None  # Root visit counts of the last search, indexed by action
+        self.simulations = 0  # Simulations run by the last search
+
+        # The memory budget sets how many nodes each tree may hold
+        n_actions = board_size * board_size + 1
+        self.max_nodes = SharedTree.nodes_for_memory(max_memory_mb, n_actions)
+        if mode == "tree":
+            self.tree = SharedTree(self.max_nodes, n_actions)
+            locks = [multiprocessing.Lock() for _ in range(LOCK_STRIPES)]
+            self.pool = ProcessPoolExecutor(workers, initializer=_attach_tree,
+                                            initargs=(self.tree.name, self.max_nodes, n_actions, locks))
+        else:
+            self.pool = ProcessPoolExecutor(workers)
+
+    def suggest_move(self, board):
+        """Search the position and return the best move as (x, y), or None to pass."""
+        self.search(board)
+        action = int(np.argmax(self.visits))
+        if action == self.board_size * self.board_size:
+            return None
+        return divmod(action, self.board_size)
+
+    def search(self, board, max_visits=None, max_time=None):
+        """Search the position with all workers. Returns the root visit counts, indexed by action."""
+        max_visits = max_visits if max_visits is not None else self.max_visits
+        max_time = max_time if max_time is not None else self.max_time
+        self.seed += self.workers
+        if self.mode == "root":
+            self._search_root(board, max_visits, max_time)
+        else:
+            self._search_tree(board, max_visits, max_time)
+        return self.visits
+
+    def _search_root(self, board, max_visits, max_time):
+        # Each independent tree gets an equal share of the memory budget
+        options = {"c_puct": self.c_puct, "max_nodes": self.max_nodes // self.workers, "komi": self.komi}
+        share = math.ceil(max_visits / self.workers)
+        futures = [
+            self.pool.submit(_root_search, board, self.evaluator, options, share, max_time, self.seed + worker)
+            for worker in range(self.workers)
+        ]
+        self.visits = np.zeros(self.board_size * self.board_size + 1, dtype=np.int64)
+        for future in futures:
+            moves, visits, _ = future.result()
+            np.add.at(self.visits, moves.astype(np.int64), visits)
+        self.simulations = int(self.visits.sum())
+
+    def _search_tree(self, board, max_visits, max_time):
+        tree = self.tree
+        tree.clear()
+        expand_shared(tree, 0, board, self.evaluator or RolloutEvaluator(komi=self.komi, seed=self.seed),
+                      trailing_passes(board))
+        options = {"c_puct": self.c_puct, "virtual_loss": self.virtual_loss, "komi": self.komi}
+        per_worker = (self.max_nodes - 1) // self.workers
+        futures = []
+        for worker in range(self.workers):
+            start = 1 + worker * per_worker
+            futures.append(self.pool.submit(_tree_search, board.copy(), self.evaluator, options,
+                                            (start, start + per_worker), max_visits, max_time,
+                                            self.seed + worker))
+        self.simulations = sum(future.result() for future in futures)
+        self.visits = tree.visits[0].astype(np.int64)
+
+    def close(self):
+        """Shut down the worker processes and free the shared tree."""
+        self.pool.shutdown()
+        if self.tree is not None:
+            self.tree.close()
+            self.tree = None
@@ -0,0 +1,239 @@
+import random
+
+from game.board import neighbor_table
+
+
+_DIAGONAL_TABLES = {}
+
+
+def diagonal_table(size):
+    """Return the flat indices of the diagonal neighbors of every point, cached per board size."""
+    table = _DIAGONAL_TABLES.get(size)
+    if table is None:
+        table = []
+        for point in range(size * size):
+            y, x = divmod(point, size)
+            table.append(tuple(
+                (y + dy) * size + (x + dx)
+                for dy in (-1, 1) for dx in (-1, 1)
+                if 0 <= x + dx < size and 0 <= y + dy < size
+            ))
+        table = tuple(table)
+        _DIAGONAL_TABLES[size] = table
+    return table
+
+
+class PlayoutBoard:
+    """
+    Stripped-down board for playing random games to the end as fast as possible.
+
+    Chains are kept as circular linked lists of stones with pseudo-liberty
+    counters on their root stone: the number, sum and sum of squares of the
+    (stone, empty neighbor) pairs. A chain is in atari exactly when all its
+    pseudo-liberties are the same point, which makes capture and suicide
+    checks O(1). The empty points are kept in a list with O(1) removal, and
+    playouts never fill a true eye of the side to move.
+
+    Only the simple ko rule is enforced, and the final position is scored by
+    area (stones plus surrounded empty points), which is exact once every
+    playout has run to two passes.
+    """
+    __slots__ = ("size", "neighbors", "diagonals", "color", "head", "next_stone", "chain_size",
+                 "libs", "lib_sum", "lib_sum_sq", "empty", "empty_index", "ko_point",
+                 "current_player", "rng")
+
+    def __init__(self, size=9, seed=None):
+        n = size * size
+        self.size = size
+        self.neighbors = neighbor_table(size)
+        self.diagonals = diagonal_table(size)
+        self.color = [0] * n  # 0: empty, 1: black, 2: white
+        self.head = list(range(n))  # Root stone of each stone's chain
+        self.next_stone = list(range(n))  # Next stone of the same chain (circular)
+        self.chain_size = [0] * n  # Stats below are only meaningful on root stones
+        self.libs = [0] * n
+        self.lib_sum = [0] * n
+        self.lib_sum_sq = [0] * n
+        self.empty = list(range(n))
+        self.empty_index = list(range(n))  # Position of each empty point in self.empty
+        self.ko_point = -1
+        self.current_player = 1
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_board(cls, board, seed=None):
+        """Build a playout board from a game.board.Board position."""
+        playout = cls(board.size, seed)
+        state = board.get_board_state().ravel()
+        for point in range(board.size * board.size):
+            if state[point]:
+                playout._put(point, int(state[point]))
+        playout.current_player = board.current_player
+        playout.ko_point = board.ko_point if board.ko_point is not None else -1
+        return playout
+
+    def in_atari(self, root):
+        """Check if a chain (given by its root stone) has a single liberty."""
+        libs = self.libs[root]
+        return libs > 0 and libs * self.lib_sum_sq[root] == self.lib_sum[root] * self.lib_sum[root]
+
+    def is_legal(self, point, color):
+        """Check if color may play at an empty point (simple ko, no suicide)."""
+        if point == self.ko_point:
+            return False
+        for neighbor in self.neighbors[point]:
+            neighbor_color = self.color[neighbor]
+            if neighbor_color == 0:
+                return True
+            atari = self.in_atari(self.head[neighbor])
+            # Joining a chain with another liberty, or capturing a chain whose last liberty this is
+            if (neighbor_color == color) != atari:
+                return True
+        return False
+
+    def is_eye(self, point, color):
+        """Check if an empty point is a true eye of color, which playouts never fill."""
+        for neighbor in self.neighbors[point]:
+            if self.color[neighbor] != color:
+                return False
+        opponent = 3 - color
+        bad = sum(1 for diagonal in self.diagonals[point] if self.color[diagonal] == opponent)
+        if len(self.diagonals[point]) < 4:
+            return bad == 0  # On the edge any enemy diagonal breaks the eye
+        return bad < 2
+
+    def play(self, point, color):
+        """Place a stone that is known to be legal, capturing as needed. Returns the stones captured."""
+        self._put(point, color)
+        captured = 0
+        captured_point = -1
+        opponent = 3 - color
+        for neighbor in self.neighbors[point]:
+            if self.color[neighbor] == opponent:
+                root = self.head[neighbor]
+                if self.libs[root] == 0:
+                    captured += self.chain_size[root]
+                    captured_point = root
+                    self._remove_chain(root)
+
+        # A lone stone that captured a lone stone and is left in atari can be retaken at once
+        root = self.head[point]
+        if captured == 1 and self.chain_size[root] == 1 and self.libs[root] == 1:
+            self.ko_point = captured_point
+        else:
+            self.ko_point = -1
+        self.current_player = 3 - color
+        return captured
+
+    def _put(self, point, color):
+        """Place a stone and merge it with its neighbors, without resolving captures."""
+        # Swap-remove the point from the empty list
+        index = self.empty_index[point]
+        last = self.empty.pop()
+        if last != point:
+            self.empty[index] = last
+            self.empty_index[last] = index
+
+        self.color[point] = color
+        self.head[point] = point
+        self.next_stone[point] = point
+        self.chain_size[point] = 1
+        libs = lib_sum = lib_sum_sq = 0
+        for neighbor in self.neighbors[point]:
+            if self.color[neighbor] == 0:
+                libs += 1
+                lib_sum += neighbor
+                lib_sum_sq += neighbor * neighbor
+            else:
+                root = self.head[neighbor]
+                self.libs[root] -= 1
+                self.lib_sum[root] -= point
+                self.lib_sum_sq[root] -= point * point
+        self.libs[point] = libs
+        self.lib_sum[point] = lib_sum
+        self.lib_sum_sq[point] = lib_sum_sq
+
+        for neighbor in self.neighbors[point]:
+            if self.color[neighbor] == color and self.head[neighbor] != self.head[point]:
+                self._merge(self.head[point], self.head[neighbor])
+
+    def _merge(self, first, second):
+        """Merge two chains given by their roots, relabelling the smaller one."""
+        if self.chain_size[first] < self.chain_size[second]:
+            first, second = second, first
+        stone = second
+        while True:
+            self.head[stone] = first
+            stone = self.next_stone[stone]
+            if stone == second:
+                break
+        self.next_stone[first], self.next_stone[second] = self.next_stone[second], self.next_stone[first]
+        self.chain_size[first] += self.chain_size[second]
+        self.libs[first] += self.libs[second]
+        self.lib_sum[first] += self.lib_sum[second]
+        self.lib_sum_sq[first] += self.lib_sum_sq[second]
+
+    def _remove_chain(self, root):
+        """Take a chain off the board, giving pseudo-liberties back to the adjacent chains."""
+        stones = []
+        stone = root
+        while True:
+            stones.append(stone)
+            stone = self.next_stone[stone]
+            if stone == root:
+                break
+        for stone in stones:
+            self.color[stone] = 0
+            self.empty_index[stone] = len(self.empty)
+            self.empty.append(stone)
+        for stone in stones:
+            for neighbor in self.neighbors[stone]:
+                if self.color[neighbor]:
+                    other = self.head[neighbor]
+                    self.libs[other] += 1
+                    self.lib_sum[other] += stone
+                    self.lib_sum_sq[other] += stone * stone
+
+    def random_move(self):
+        """Pick a random legal move for the player to move that does not fill its own eye, or -1 to pass."""
+        color = self.current_player
+        empty = self.empty
+        count = len(empty)
+        if not count:
+            return -1
+        start = self.rng.randrange(count)
+        for i in range(count):
+            point = empty[(start + i) % count]
+            if not self.is_eye(point, color) and self.is_legal(point, color):
+                return point
+        return -1
+
+    def playout(self, max_moves=None):
+        """Play random moves until both players pass. Returns the number of moves played."""
+        if max_moves is None:
+            max_moves = 3 * self.size * self.size
+        moves = 0
+        passes = 0
+        while passes < 2 and moves < max_moves:
+            point = self.random_move()
+            if point < 0:
+                passes += 1
+                self.ko_point = -1
+                self.current_player = 3 - self.current_player
+            else:
+                passes = 0
+                self.play(point, self.current_player)
+            moves += 1
+        return moves
+
+    def score(self):
+        """Area score (stones plus empty points surrounded by one color) as (black, white)."""
+        counts = [0, 0, 0]
+        for point in range(self.size * self.size):
+            color = self.color[point]
+            if color == 0:
+                around = {self.color[neighbor] for neighbor in self.neighbors[point]}
+                if len(around) == 1:
+                    color = around.pop()
+            counts[color] += 1
+        return counts[1], counts[2]
@@ -0,0 +1,133 @@
+import random
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from game.board import ZOBRIST_WHITE_TO_MOVE, zobrist_table
+from game.vector_ops import symmetry_permutations
+
+
+_KEY_TABLES = {}
+
+
+def key_tables(size):
+    """
+    Return (stone_keys, ko_keys) for canonical hashing, cached per board size.
+    stone_keys[action, color] is the board's Zobrist key of that stone, indexed by
+    action (x * size + y) instead of point; ko_keys[action] marks the ko point.
+    """
+    tables = _KEY_TABLES.get(size)
+    if tables is None:
+        zobrist = zobrist_table(size)
+        stone_keys = np.zeros((size * size, 3), dtype=np.uint64)
+        for action in range(size * size):
+            x, y = divmod(action, size)
+            stone_keys[action] = zobrist[y * size + x]
+        rng = random.Random(f"ko-{size}")
+        ko_keys = np.array([rng.getrandbits(64) for _ in range(size * size)], dtype=np.uint64)
+        tables = (stone_keys, ko_keys)
+        _KEY_TABLES[size] = tables
+    return tables
+
+
+def canonical_key(state, player, ko_point=None, symmetries=True):
+    """
+    Hash a position the same way as every rotation and reflection of it.
+
+    state is a [y, x] board array, player the side to move and ko_point the
+    board's ko point (y * size + x) or None. The position is Zobrist-hashed in
+    each of the 8 orientations of vector_ops.transform_states and the smallest
+    hash is kept. Returns (key, symmetry): the symmetry that takes the position
+    to its canonical orientation.
+    """
+    state = np.asarray(state)
+    size = state.shape[-1]
+    stone_keys, ko_keys = key_tables(size)
+    permutations = symmetry_permutations(size)[:8 if symmetries else 1, :size * size]
+
+    flat = state.T.ravel()  # Indexed by action
+    stones = np.flatnonzero(flat)
+    # Row k: the key of every stone once moved by symmetry k
+    keys = stone_keys[permutations[:, stones], flat[stones]]
+    hashes = np.bitwise_xor.reduce(keys, axis=1) if len(stones) else np.zeros(len(permutations), dtype=np.uint64)
+    if ko_point is not None:
+        y, x = divmod(ko_point, size)
+        hashes ^= ko_keys[permutations[:, x * size + y]]
+    symmetry = int(np.argmin(hashes))
+    key = int(hashes[symmetry])
+    if player == 2:
+        key ^= ZOBRIST_WHITE_TO_MOVE
+    return key, symmetry
+
+
+class EvaluationCache:
+    """
+    Bounded cache in front of a search evaluator (see game.ai.MCTS), such as
+    GoAIModel.evaluate_position or a BatchedEvaluator.
+
+    Positions are keyed by canonical_key, so a position reached by a different
+    move order, or any rotation or reflection of one already evaluated, is a
+    hit. Priors are stored in the canonical orientation and turned back to the
+    orientation of the position asked about. When the cache holds max_entries
+    positions the least recently used one is evicted.
+
+    Only cache deterministic evaluators: a RolloutEvaluator's value is one
+    random playout, and caching it would freeze that sample.
+    """
+
+    def __init__(self, evaluator, max_entries=100000, symmetries=True):
+        self.evaluator = evaluator
+        self.max_entries = max_entries
+        self.symmetries = symmetries
+        self.entries = OrderedDict()  # Key -> (canonical priors or None, value)
+        self.lock = threading.Lock()  # Searches in several threads may share one cache
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, board):
+        key, symmetry = canonical_key(board.get_board_state(), board.current_player, board.ko_point,
+                                      self.symmetries)
+        permutation = symmetry_permutations(board.size)[symmetry]
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if entry is not None:
+            priors, value = entry
+            # priors[a] is stored at the canonical action permutation[a]
+            return (priors[permutation[:len(priors)]] if priors is not None else None), value
+
+        priors, value = self.evaluator(board)
+        canonical = None
+        if priors is not None:
+            priors = np.asarray(priors)
+            canonical = np.empty_like(priors)
+            canonical[permutation[:len(priors)]] = priors
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = (canonical, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return priors, value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Size, hit rate and eviction counters so far."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,127 @@
+import numpy as np
+
+
+_PERMUTATIONS = {}
+
+
+def shift(array, dy, dx, fill=0):
+    """Shift the last two (y, x) axes of an array by one point, filling the uncovered edge."""
+    shifted = np.full_like(array, fill)
+    ys = slice(1, None) if dy > 0 else slice(None, -1) if dy < 0 else slice(None)
+    yt = slice(None, -1) if dy > 0 else slice(1, None) if dy < 0 else slice(None)
+    xs = slice(1, None) if dx > 0 else slice(None, -1) if dx < 0 else slice(None)
+    xt = slice(None, -1) if dx > 0 else slice(1, None) if dx < 0 else slice(None)
+    shifted[..., ys, xs] = array[..., yt, xt]
+    return shifted
+
+
+DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+
+def neighbor_views(array, fill=0):
+    """Return the value of each point's four neighbors as four arrays (fill off the board)."""
+    return [shift(array, dy, dx, fill) for dy, dx in DIRECTIONS]
+
+
+def dilate(mask):
+    """Grow a boolean mask by one point in every direction."""
+    grown = mask.copy()
+    grown[..., 1:, :] |= mask[..., :-1, :]
+    grown[..., :-1, :] |= mask[..., 1:, :]
+    grown[..., :, 1:] |= mask[..., :, :-1]
+    grown[..., :, :-1] |= mask[..., :, 1:]
+    return grown
+
+
+def flood(seed, within):
+    """Grow seed through the connected points of within until it stops changing."""
+    region = seed & within
+    while True:
+        grown = dilate(region) & within
+        if np.array_equal(grown, region):
+            return region
+        region = grown
+
+
+def label_groups(boards):
+    """
+    Label the connected groups of stones of a batch of boards.
+    Returns an int64 array shaped like boards with 0 on empty points and a
+    label on every stone that is unique across the whole batch.
+    """
+    stones = boards != 0
+    big = boards.size + 1
+    labels = np.where(stones, np.arange(1, boards.size + 1).reshape(boards.shape), 0)
+    connected = [stones & (shift(boards, dy, dx, -1) == boards) for dy, dx in DIRECTIONS]
+    while True:
+        # Take the smallest label among same-colored neighbors...
+        candidate = np.where(stones, labels, big)
+        for (dy, dx), same in zip(DIRECTIONS, connected):
+            candidate = np.minimum(candidate, np.where(same, shift(labels, dy, dx, big), big))
+        candidate = np.where(stones, candidate, 0)
+        # ...then jump: a label is the id of a stone in the same group, so adopt that stone's label
+        flat = candidate.ravel()
+        candidate = np.where(stones, np.concatenate(([0], flat))[candidate], 0)
+        if np.array_equal(candidate, labels):
+            return labels
+        labels = candidate
+
+
+def liberty_counts(boards, labels=None):
+    """Return, for every stone, the number of liberties of its group (0 on empty points)."""
+    if labels is None:
+        labels = label_groups(boards)
+    total = boards.size
+    empty = boards == 0
+    point_ids = np.arange(total).reshape(boards.shape)
+
+    # One key per (group, adjacent empty point) pair; duplicates are the same liberty
+    keys = []
+    for neighbor in neighbor_views(labels):
+        adjacent = empty & (neighbor > 0)
+        keys.append(neighbor[adjacent] * total + point_ids[adjacent])
+    keys = np.unique(np.concatenate(keys)) if keys else np.zeros(0, dtype=np.int64)
+    counts = np.bincount(keys // total, minlength=total + 1)
+    return counts[labels]
+
+
+def territory(boards):
+    """
+    Return boolean masks of the empty points owned by black and by white.
+    An empty region belongs to a color when every stone bordering it is of that color.
+    """
+    empty = boards == 0
+    black_reach = flood(dilate(boards == 1), empty)
+    white_reach = flood(dilate(boards == 2), empty)
+    return black_reach & ~white_reach, white_reach & ~black_reach
+
+
+def transform_states(states, symmetry):
+    """
+    Apply one of the 8 board symmetries to the last two (y, x) axes of an array:
+    symmetry % 4 quarter turns, then a transpose when symmetry >= 4. 0 is the identity.
+    """
+    states = np.rot90(states, symmetry % 4, axes=(-2, -1))
+    if symmetry >= 4:
+        states = np.swapaxes(states, -2, -1)
+    return states
+
+
+def symmetry_permutations(size):
+    """
+    Return an (8, size * size + 1) array mapping each action (x * size + y, plus
+    pass) to the same move on a board transformed by transform_states. Cached per size.
+    """
+    table = _PERMUTATIONS.get(size)
+    if table is None:
+        n_points = size * size
+        ys, xs = np.indices((size, size))
+        actions = xs * size + ys  # The action of every [y, x] point
+        table = np.empty((8, n_points + 1), dtype=np.int64)
+        for symmetry in range(8):
+            # After the transform, the point at [y', x'] holds the action that moved there
+            moved = transform_states(actions, symmetry)
+            table[symmetry, moved.ravel()] = actions.ravel()
+            table[symmetry, n_points] = n_points  # Pass stays pass
+        _PERMUTATIONS[size] = table
+    return table
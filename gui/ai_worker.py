@@ -0,0 +1,80 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AIWorker:
+    """
+    Runs the AI's thinking on a background thread so the Tk event loop never waits for the engine.
+
+    Jobs run one at a time, in order, on the worker thread, and are called with
+    a threading.Event as their last argument that is set when the job is
+    cancelled; long jobs should check it and return early. Anything the jobs
+    share (a search tree, say) is then only ever touched from that thread.
+
+    request() runs a job whose result the GUI wants, background() one whose
+    result is dropped (pondering). Starting either cancels the job before it.
+    Tk widgets must only be touched from the main thread, so results are not
+    pushed to the GUI: the GUI polls them with poll() from a window.after callback.
+    """
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.generation = 0  # Bumped by every job and cancel; older results are dropped
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="ai-worker", daemon=True)
+        self.thread.start()
+
+    def request(self, job, *args):
+        """Cancel the current job and run job(*args, stop_event); poll() returns its result."""
+        self.cancel()
+        self.jobs.put((self.generation, job, args, self.stop_event, True))
+
+    def background(self, job, *args):
+        """Cancel the current job and run job(*args, stop_event) until it returns or is cancelled."""
+        self.cancel()
+        self.jobs.put((self.generation, job, args, self.stop_event, False))
+
+    def cancel(self):
+        """Stop the current job, if any, and forget its result."""
+        self.stop_event.set()
+        self.stop_event = threading.Event()
+        self.generation += 1
+
+    def poll(self):
+        """
+        Return ("move", result, seconds) or ("error", exception, seconds) for the
+        latest request once it is done, or None while the AI is still thinking.
+        """
+        while True:
+            try:
+                generation, kind, value, seconds = self.results.get_nowait()
+            except queue.Empty:
+                return None
+            if generation == self.generation:
+                return kind, value, seconds
+
+    def close(self):
+        self.cancel()
+        self.jobs.put(None)
+
+    def _run(self):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                return
+            generation, job, args, stop_event, wanted = item
+            if stop_event.is_set():
+                continue  # Cancelled before it started
+            start = time.perf_counter()
+            try:
+                result = ("move", job(*args, stop_event))
+            except Exception as error:
+                logger.exception("The AI failed")
+                result = ("error", error)
+            if wanted:
+                self.results.put((generation,) + result + (time.perf_counter() - start,))
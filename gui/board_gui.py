@@ -1,48 +1,89 @@
+import logging
+import threading
 import tkinter as tk
 import numpy as np
 import os
+from game.ai import MCTS
 from game.board import Board
+from gui.ai_worker import AIWorker
 from ml.model import GoAIModel
-from ml.go_env import GoEnv
+from ml.demo_store import DemoStore
+
+logger = logging.getLogger(__name__)
+
+PLAYER_NAMES = {1: "Black", 2: "White"}
+
+# How often the GUI checks whether the AI has finished thinking, and the model loading
+AI_POLL_MS = 20
+MODEL_POLL_MS = 100
+
+MODEL_STATUS_TEXT = {
+    "loading": "Loading model...",
+    "ready": "Model loaded",
+    "missing": "No trained model",
+    "failed": "Model failed to load",
+}
 
 class GoGameGUI:
-    def __init__(self, board_size=9):
+    def __init__(self, board_size=9, engine="model", think_time=1.0, max_visits=800, ponder=True,
+                 ponder_nodes=10000, board_pixels=450):
+        """
+        engine: "model" plays GoAIModel.predict, "mcts" searches with game.ai.MCTS.
+        think_time, max_visits: the search budget per move for "mcts", whichever runs out first.
+        ponder: with "mcts", keep searching while the player thinks. The part of the tree
+        below the player's actual move is kept, and its visits count towards the next budget.
+        ponder_nodes: the most tree nodes kept between moves (about 1.8 KB each); pondering
+        stops when the tree reaches it.
+        board_pixels: width of the grid on screen; raise it for comfortable 13x13 or 19x19 boards.
+        """
+        if engine not in ("model", "mcts"):
+            raise ValueError(f"Unknown engine: {engine}")
         self.board_size = board_size
         self.board = Board(board_size)
-        self.cell_size = 450 // (board_size - 1)
+        self.engine = engine
+        self.think_time = think_time
+        self.max_visits = max_visits
+        self.ponder = ponder
+        self.ponder_nodes = ponder_nodes
+        self.cell_size = board_pixels // (board_size - 1)
+        self.grid_pixels = self.cell_size * (board_size - 1)
         self.margin = self.cell_size // 2
+        self.stone_radius = max(2, min(15, int(self.cell_size * 0.45)))  # 15 on 9x9, smaller on denser grids
+
+        # Canvas item of the stone drawn on every point (flat y * size + x), and the board they show
+        self.stone_items = [None] * (board_size * board_size)
+        self.drawn = np.zeros((board_size, board_size), dtype=int)
 
         # Paths to the model and data files
         # Since board_gui.py is in gui/ and files are in ml/, we go up one directory (..) and into ml/
         self.model_path = "../go_game/ml/go_ai_model"
         self.bc_policy_path = "../ml/go_bc_policy"
-        self.demos_path = "../ml/data/demos.npz"
-
-        # Initialize the Go environment and AI
-        self.env = GoEnv(board_size)
-        self.ai = GoAIModel(self.env, board_size)
-
-        # Debug prints for paths
-        print("Current working directory:", os.getcwd())
-        print("Attempting to load model from:", os.path.abspath(self.model_path + ".zip"))
-
-        # Load the model
-        if os.path.exists(self.model_path + ".zip"):
-            print("Found go_ai_model.zip, loading...")
-            self.ai.load(self.model_path)
-        elif os.path.exists(self.bc_policy_path + ".zip"):
-            print("Found go_bc_policy.zip, loading...")
-            self.ai.load(self.bc_policy_path)
-        else:
-            print("No trained model found. Ensure that go_ai_model.zip or go_bc_policy.zip exists in the ml folder.")
+        self.demos_path = "../ml/data/demos"
+
+        # Initialize the AI. No network is built here: a saved one is loaded once the window is up
+        self.ai = GoAIModel(board_size=board_size)
+        self.model_status = "loading"  # Then "ready", "missing" or "failed"
+        self.model_ready = threading.Event()  # Set once loading is over, whatever the outcome
+
+        # Debug logging for paths
+        logger.debug("Current working directory: %s", os.getcwd())
+        logger.debug("Attempting to load model from: %s", os.path.abspath(self.model_path + ".zip"))
+
+        # The AI thinks on a background thread; the search is only built when used
+        self.search = MCTS(board_size, max_visits=max_visits) if engine == "mcts" else None
+        self.search_game = None  # Game the search tree belongs to (only used on the worker thread)
+        self.game_number = 0
+        self.ai_worker = AIWorker()
+        self.ai_thinking = False
 
         # Initialize the GUI
         self.window = tk.Tk()
         self.window.title("Go Game")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
         self.canvas = tk.Canvas(
             self.window,
-            width=450 + self.cell_size,
-            height=450 + self.cell_size,
+            width=self.grid_pixels + self.cell_size,
+            height=self.grid_pixels + self.cell_size,
             bg="tan",
         )
         self.canvas.pack()
@@ -53,6 +94,8 @@ class GoGameGUI:
         self.turn_label = tk.Label(self.window, text="", font=("Helvetica", 14))
         self.turn_label.pack(anchor="ne")
         self.update_turn_indicator()
+        self.model_label = tk.Label(self.window, text=MODEL_STATUS_TEXT["loading"], fg="gray")
+        self.model_label.pack(anchor="ne")
 
         # Add a pass button for the player
         pass_button = tk.Button(self.window, text="Pass", command=self.player_pass)
@@ -73,62 +116,83 @@ class GoGameGUI:
         self.ai_wins = 0
         self.player_wins = 0
 
-        # Ensure the data directory exists
-        demos_dir = os.path.dirname(self.demos_path)
-        if not os.path.exists(demos_dir):
-            os.makedirs(demos_dir)
+        # Finished games are appended to the demonstration store (created on the first save)
+        self.demos = DemoStore(self.demos_path, board_size)
 
         # Lists to store states and actions for demonstrations
         self.recorded_states = []
         self.recorded_actions = []
 
+        # Importing stable-baselines3 and torch and reading the model take seconds:
+        # start once the first frame is drawn, and do it on a background thread
+        self.window.after_idle(self.start_loading_model)
+
+    def start_loading_model(self):
+        threading.Thread(target=self.load_model, name="model-loader", daemon=True).start()
+        self.window.after(MODEL_POLL_MS, self.poll_model)
+
+    def load_model(self):
+        """Runs on the model-loader thread: load the trained model into self.ai, if there is one."""
+        try:
+            if os.path.exists(self.model_path + ".zip"):
+                logger.info("Found go_ai_model.zip, loading...")
+                self.ai.load(self.model_path)
+            elif os.path.exists(self.bc_policy_path + ".zip"):
+                logger.info("Found go_bc_policy.zip, loading...")
+                self.ai.load(self.bc_policy_path)
+            else:
+                logger.warning("No trained model found. Ensure that go_ai_model.zip or go_bc_policy.zip exists in the ml folder.")
+                self.model_status = "missing"
+                return
+            self.model_status = "ready"
+        except Exception:
+            logger.exception("Could not load the model")
+            self.model_status = "failed"
+        finally:
+            self.model_ready.set()
+
+    def poll_model(self):
+        if not self.model_ready.is_set():
+            self.window.after(MODEL_POLL_MS, self.poll_model)
+            return
+        self.model_label.config(text=MODEL_STATUS_TEXT[self.model_status])
+
     def draw_grid(self):
+        """Draw the grid lines. Done once: stones are drawn over them and the grid never changes."""
         for i in range(self.board_size):
             # Draw vertical lines
             self.canvas.create_line(
                 self.margin + i * self.cell_size,
                 self.margin,
                 self.margin + i * self.cell_size,
-                450 + self.margin,
+                self.grid_pixels + self.margin,
                 fill="black",
+                tags="grid",
             )
             # Draw horizontal lines
             self.canvas.create_line(
                 self.margin,
                 self.margin + i * self.cell_size,
-                450 + self.margin,
+                self.grid_pixels + self.margin,
                 self.margin + i * self.cell_size,
                 fill="black",
+                tags="grid",
             )
 
-        # Draw the right and bottom border lines explicitly
-        self.canvas.create_line(
-            self.margin + (self.board_size - 1) * self.cell_size,
-            self.margin,
-            self.margin + (self.board_size - 1) * self.cell_size,
-            450 + self.margin,
-            fill="black",
-        )
-        self.canvas.create_line(
-            self.margin,
-            self.margin + (self.board_size - 1) * self.cell_size,
-            450 + self.margin,
-            self.margin + (self.board_size - 1) * self.cell_size,
-            fill="black",
-        )
-
     def handle_click(self, event):
+        if self.ai_thinking:
+            return  # Not the player's turn
         x = round((event.x - self.margin) / self.cell_size)
         y = round((event.y - self.margin) / self.cell_size)
 
-        print(f"Player clicked at ({x}, {y}). Current player: {'Black' if self.board.current_player == 1 else 'White'}")
+        logger.debug("Player clicked at (%d, %d). Current player: %s", x, y, PLAYER_NAMES[self.board.current_player])
 
         if 0 <= x < self.board_size and 0 <= y < self.board_size:
             current_state = self.board.get_board_state().copy()
             chosen_action = x * self.board_size + y
 
             if self.board.place_stone(x, y):  # Only proceed if player's move is valid
-                print(f"Player placed a stone at ({x}, {y}).")
+                logger.debug("Player placed a stone at (%d, %d).", x, y)
 
                 # Record the demonstration (state before placing and the chosen action)
                 self.recorded_states.append(current_state)
@@ -139,12 +203,15 @@ class GoGameGUI:
                 self.consecutive_passes = 0  # Reset consecutive passes
 
                 # AI's move
-                self.make_ai_move()
+                self.make_ai_move((x, y))
             else:
-                print(f"Invalid move by Player at ({x}, {y}). Stone not placed.")
+                logger.info("Invalid move by Player at (%d, %d). Stone not placed.", x, y)
 
     def player_pass(self):
-        print("Player passed their turn.")
+        if self.ai_thinking:
+            return
+        logger.debug("Player passed their turn.")
+        self.board.play(None, None)  # Hands the turn to the AI
         self.consecutive_passes += 1
         self.update_turn_indicator()
 
@@ -154,22 +221,75 @@ class GoGameGUI:
             return
 
         # AI's move
-        self.make_ai_move()
+        self.make_ai_move(None)
+
+    def make_ai_move(self, player_move):
+        """
+        Ask the AI worker for a move after the player's move ((x, y) or None for a pass);
+        apply_ai_move plays it when it arrives. This also stops any pondering.
+        """
+        logger.debug("AI's turn. Current player: %s", PLAYER_NAMES[self.board.current_player])
+        self.ai_thinking = True
+        self.turn_label.config(text="AI is thinking...", fg="gray")
+        self.ai_worker.request(self.choose_ai_move, self.board.copy(), player_move, self.game_number)
+        self.window.after(AI_POLL_MS, self.poll_ai_move)
+
+    def choose_ai_move(self, board, player_move, game_number, stop_event):
+        """Runs on the AI worker thread: return the AI's action for the board, or None to pass."""
+        if self.engine != "mcts":
+            return self.ai.predict(board.get_board_state())
+
+        # The tree's root is the position before the player's move: keep the subtree below it
+        if self.search_game == game_number:
+            self.search.advance(player_move)
+        else:
+            self.search.reset()
+            self.search_game = game_number
+        reused = int(self.search.root.visits.sum()) if self.search.root is not None else 0
+        self.search.search(board, max_visits=self.max_visits, max_time=self.think_time, stop_event=stop_event)
+        logger.debug("Searched %d visits, %d of them kept from earlier", self.search.root.visits.sum(), reused)
+        move = self.search.best_move()
+        self.search.advance(move)  # Follow the AI's move so the tree can be pondered and reused
+        self.search.prune(self.ponder_nodes)  # Only keep what may be held during the player's turn
+        return None if move is None else move[0] * self.board_size + move[1]
+
+    def ponder_position(self, board, game_number, stop_event):
+        """Runs on the AI worker thread during the player's turn: search until cancelled or out of ponder_nodes."""
+        if self.search_game != game_number:
+            return
+        search = self.search
+        while not stop_event.is_set() and search.node_count < self.ponder_nodes:
+            visits = int(search.root.visits.sum()) if search.root is not None else 0
+            search.search(board, max_visits=visits + 100, stop_event=stop_event)
+
+    def start_pondering(self):
+        if self.engine == "mcts" and self.ponder:
+            self.ai_worker.background(self.ponder_position, self.board.copy(), self.game_number)
+
+    def poll_ai_move(self):
+        if not self.ai_thinking:
+            return  # Cancelled
+        result = self.ai_worker.poll()
+        if result is None:
+            self.window.after(AI_POLL_MS, self.poll_ai_move)
+            return
+        kind, action, seconds = result
+        self.ai_thinking = False
+        logger.debug("AI thought for %.3f s", seconds)
+        self.apply_ai_move(action if kind == "move" else None)  # An engine error counts as a pass
 
-    def make_ai_move(self):
-        print(f"AI's turn. Current player: {'Black' if self.board.current_player == 1 else 'White'}")
+    def apply_ai_move(self, action):
         current_state = self.board.get_board_state().copy()
-        action = self.ai.predict(current_state)  # Get AI's action
 
         if action is None:  # AI decides to pass
-            print("AI passed its turn.")
+            logger.debug("AI passed its turn.")
             self.consecutive_passes += 1
-            self.board.current_player = 1  # Switch back to Black
+            self.board.play(None, None)  # Switch back to the player
             self.update_turn_indicator()
         else:
             ai_x, ai_y = divmod(action, self.board_size)
             if self.board.place_stone(ai_x, ai_y):  # Ensure AI's move is valid
-                print(f"AI placed a stone at ({ai_x}, {ai_y}).")
+                logger.debug("AI placed a stone at (%d, %d).", ai_x, ai_y)
 
                 # Record the demonstration for AI move
                 self.recorded_states.append(current_state)
@@ -179,60 +299,65 @@ class GoGameGUI:
                 self.update_turn_indicator()
                 self.consecutive_passes = 0
             else:
-                print(f"AI tried an invalid move at ({ai_x}, {ai_y}). Passing turn.")
+                logger.warning("AI tried an invalid move at (%d, %d). Passing turn.", ai_x, ai_y)
                 self.consecutive_passes += 1
-                self.board.current_player = 1
+                self.board.play(None, None)
                 self.update_turn_indicator()
 
         # Check if both players passed
         if self.consecutive_passes >= 2:
             self.end_game()
+        else:
+            self.start_pondering()
 
     def restart_game(self):
-        print("Game restarted.")
+        logger.debug("Game restarted.")
+        self.ai_worker.cancel()  # Drop the move the AI may be thinking about
+        self.ai_thinking = False
+        self.game_number += 1  # The search tree starts over
         self.board.reset_board()
         self.consecutive_passes = 0
         self.board.current_player = 1
-        self.canvas.delete("stones")  # Clear stones
-        self.draw_grid()
+        self.canvas.delete("message")  # Clear the game over message
+        self.draw_stones()  # Clear stones
         self.update_turn_indicator()
         # Clear recorded states and actions for a fresh game
         self.recorded_states = []
         self.recorded_actions = []
 
     def draw_stones(self):
-        self.canvas.delete("stones")
-        for x in range(self.board_size):
-            for y in range(self.board_size):
-                if self.board.board[y][x] == 1:  # Black stone
-                    self.canvas.create_oval(
-                        self.margin + x * self.cell_size - 15,
-                        self.margin + y * self.cell_size - 15,
-                        self.margin + x * self.cell_size + 15,
-                        self.margin + y * self.cell_size + 15,
-                        fill="black",
-                        tags="stones",
-                    )
-                elif self.board.board[y][x] == 2:  # White stone
-                    self.canvas.create_oval(
-                        self.margin + x * self.cell_size - 15,
-                        self.margin + y * self.cell_size - 15,
-                        self.margin + x * self.cell_size + 15,
-                        self.margin + y * self.cell_size + 15,
-                        fill="white",
-                        outline="black",
-                        tags="stones",
-                    )
+        """Bring the canvas up to date with the board, redrawing only the points that changed."""
+        changed = np.flatnonzero(self.board.board != self.drawn)
+        for point in changed:
+            y, x = divmod(int(point), self.board_size)
+            if self.stone_items[point] is not None:  # Captured, or replaced after a restart
+                self.canvas.delete(self.stone_items[point])
+                self.stone_items[point] = None
+            color = self.board.board[y][x]
+            if color:
+                cx = self.margin + x * self.cell_size
+                cy = self.margin + y * self.cell_size
+                r = self.stone_radius
+                self.stone_items[point] = self.canvas.create_oval(
+                    cx - r, cy - r, cx + r, cy + r,
+                    fill="black" if color == 1 else "white",
+                    outline="black",
+                    tags="stones",
+                )
+        self.drawn = self.board.board.copy()
 
     def update_turn_indicator(self):
         if self.board.current_player == 1:
             self.turn_label.config(text="Turn: Black (Place Black Stone)", fg="black")
-            print("It's Black's turn.")
+            logger.debug("It's Black's turn.")
         else:
             self.turn_label.config(text="Turn: White (Place White Stone)", fg="white")
-            print("It's White's turn.")
+            logger.debug("It's White's turn.")
 
     def end_game(self):
+        self.ai_worker.cancel()
+        self.ai_thinking = False
+        self.game_number += 1
         black_score, white_score = self.board.calculate_score()
         winner = "Black" if black_score > white_score else "White"
 
@@ -241,28 +366,36 @@ class GoGameGUI:
         else:
             self.ai_wins += 1
 
-        print(f"Game Over! Black: {black_score}, White: {white_score}. Winner: {winner}")
-        print(f"Player Wins: {self.player_wins}, AI Wins: {self.ai_wins}")
-        print(f"Captured by AI: {self.board.captured_white}, Captured by Player: {self.board.captured_black}")
+        logger.info("Game Over! Black: %s, White: %s. Winner: %s", black_score, white_score, winner)
+        logger.info("Player Wins: %d, AI Wins: %d", self.player_wins, self.ai_wins)
+        logger.info("Captured by AI: %d, Captured by Player: %d", self.board.captured_white, self.board.captured_black)
 
         message = f"Game Over!\nBlack: {black_score}\nWhite: {white_score}\nWinner: {winner}"
         self.canvas.create_text(
-            225 + self.margin,
-            225 + self.margin,
+            self.grid_pixels // 2 + self.margin,
+            self.grid_pixels // 2 + self.margin,
             text=message,
             fill="red",
             font=("Helvetica", 16),
-            tags="stones",
+            tags="message",
         )
 
-        # Save demonstrations to ../ml/data/demos.npz
+        # Append the game to the demonstrations in ../ml/data/demos
         if self.recorded_states and self.recorded_actions:
-            np.savez(self.demos_path, states=np.array(self.recorded_states), actions=np.array(self.recorded_actions))
-            print(f"Demonstrations saved to {self.demos_path}")
+            self.demos.append_game(self.recorded_states, self.recorded_actions, self.board.get_board_state(),
+                                   winner=1 if winner == "Black" else -1)
+            logger.info("Demonstrations saved to %s (%d games)", self.demos_path, len(self.demos))
+            # Saved once: ending the game again must not append it twice
+            self.recorded_states = []
+            self.recorded_actions = []
 
     def run(self):
         self.window.mainloop()
 
+    def close(self):
+        self.ai_worker.close()
+        self.window.destroy()
+
 
 # Run the GUI (for testing purposes)
 if __name__ == "__main__":
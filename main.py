@@ -1,5 +1,16 @@
+import logging
+import os
+
+from game import instrumentation
 from gui.board_gui import GoGameGUI
 
 if __name__ == "__main__":
+    # GO_LOG_LEVEL=DEBUG logs every move; GO_INSTRUMENT=profile.json records where the time goes
+    logging.basicConfig(level=os.environ.get("GO_LOG_LEVEL", "INFO"), format="%(levelname)s %(name)s: %(message)s")
+    instrumentation.from_environment()
     game_gui = GoGameGUI(board_size=9)
-    game_gui.run()
+    try:
+        game_gui.run()
+    finally:
+        if instrumentation.enabled():
+            instrumentation.stop_dump()
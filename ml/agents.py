@@ -0,0 +1,231 @@
+import random
+
+import numpy as np
+
+from game.ai import MCTS, GoAI, RolloutEvaluator
+from game.heuristics import score_moves
+from game.transposition import EvaluationCache
+
+
+class RandomAgent:
+    """Plays a uniformly random legal move, passing only when there is none."""
+
+    def __init__(self, board_size=9, seed=None):
+        self.board_size = board_size
+        self.rng = random.Random(seed)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng.seed(seed)
+
+    def select_action(self, board):
+        legal = np.flatnonzero(board.legal_moves().T.ravel())
+        if not len(legal):
+            return self.board_size * self.board_size
+        return int(legal[self.rng.randrange(len(legal))])
+
+
+class HeuristicAgent:
+    """
+    The move scoring of GoAIModel.predict (game.heuristics.score_moves), for either color.
+    Illegal moves are skipped, ties are broken at random, and it passes when no move scores above 0.
+    """
+
+    def __init__(self, board_size=9, seed=None):
+        self.board_size = board_size
+        self.rng = np.random.default_rng(seed)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
+    def select_action(self, board):
+        scores = score_moves(board.get_board_state(), player=board.current_player).T.ravel()
+        scores[~board.legal_moves().T.ravel()] = -np.inf
+        best = scores.max()
+        if best <= 0:
+            return self.board_size * self.board_size
+        return int(self.rng.choice(np.flatnonzero(scores == best)))
+
+
+class MCTSAgent:
+    """
+    game.ai.MCTS with random playouts, keeping its tree between the moves of a game.
+    Each move searches until max_visits or max_time seconds, whichever comes first.
+    """
+
+    def __init__(self, board_size=9, seed=None, max_visits=200, komi=0, max_time=None):
+        self.board_size = board_size
+        self.search = MCTS(board_size, max_visits=max_visits, max_time=max_time, komi=komi, seed=seed)
+        self.moves_played = None  # Length of the board's move history once this agent's last move is played
+
+    def reset(self, seed=None):
+        self.search.reset()
+        self.moves_played = None
+        if seed is not None and isinstance(self.search.evaluator, RolloutEvaluator):
+            self.search.evaluator.rng.seed(seed)
+
+    def select_action(self, board):
+        history = board.undo_stack
+        if self.moves_played is not None and len(history) == self.moves_played + 1:
+            # One opponent move since ours: follow it down the tree
+            point = history[-1][0]
+            self.search.advance(None if point is None else (point % self.board_size, point // self.board_size))
+        else:
+            self.search.reset()  # Not the game this tree was searched for
+        move = self.search.suggest_move(board)
+        self.search.advance(move)
+        self.moves_played = len(history) + 1
+        if move is None:
+            return self.board_size * self.board_size
+        x, y = move
+        return x * self.board_size + y
+
+
+class PolicyAgent:
+    """
+    Plays the most likely legal move of a trained policy: a PPO model saved by
+    train.py / ppo_finetune.py, the policy saved by imitation_train.py, or
+    (kind "npz") one exported by ml/export.py, which runs without torch.
+    The policy sees the raw board state, like GoEnv observations. Its outputs are
+    cached (see game.transposition), so positions met again in later games are free.
+    """
+
+    def __init__(self, board_size=9, seed=None, path="go_ai_model", kind="ppo", cache_size=100000):
+        self.board_size = board_size
+        if kind == "npz":
+            from ml.numpy_policy import NumpyPolicy
+            self.evaluate = NumpyPolicy.load(path).cached_evaluator(cache_size)
+            return
+
+        # torch and stable-baselines3 are only imported by agents that need them
+        import torch
+        from stable_baselines3 import PPO
+        from stable_baselines3.common.policies import ActorCriticPolicy
+
+        self.torch = torch
+        if kind == "bc":
+            self.policy = ActorCriticPolicy.load(path)
+        else:
+            self.policy = PPO.load(path, device="cpu").policy
+        self.policy.set_training_mode(False)
+        self.evaluate = EvaluationCache(self._evaluate, cache_size)
+
+    def reset(self, seed=None):
+        pass
+
+    def _evaluate(self, board):
+        obs, _ = self.policy.obs_to_tensor(board.get_board_state())
+        with self.torch.no_grad():
+            probs = self.policy.get_distribution(obs).distribution.probs[0].cpu().numpy()
+            value = float(self.policy.predict_values(obs)[0, 0])
+        return probs, value
+
+    def select_action(self, board):
+        pass_action = self.board_size * self.board_size
+        probs, _ = self.evaluate(board)
+        legal = board.legal_moves().T.ravel()
+        if len(probs) > pass_action:
+            legal = np.append(legal, True)  # The policy has a pass action
+        if not legal.any():
+            return pass_action
+        return int(np.argmax(np.where(legal, probs, -1.0)))
+
+
+class StateAgent:
+    """
+    Adapter for the older players that only see the stones and are asked for a move
+    with choose(state), which returns an action or None to pass: game.ai.GoAI,
+    ml.policy.GoPolicy and GoAIModel.predict. They know nothing of ko or suicide,
+    so an illegal move they choose is played as a pass.
+    as_white: choose() assumes it plays White (like GoAIModel.predict); when it
+    plays Black it is shown the board with the colors swapped.
+    """
+
+    def __init__(self, board_size, choose, as_white=False):
+        self.board_size = board_size
+        self.choose = choose
+        self.as_white = as_white
+
+    def reset(self, seed=None):
+        if seed is not None:  # GoAI and GoPolicy draw from the global generators
+            random.seed(seed)
+            np.random.seed(seed % 2 ** 32)
+
+    def select_action(self, board):
+        state = board.get_board_state()
+        if self.as_white and board.current_player == 1:
+            state = np.where(state == 0, 0, 3 - state)
+        action = self.choose(state)
+        if action is None:
+            return self.board_size * self.board_size
+        x, y = divmod(action, self.board_size)
+        if not board.legal_moves()[y, x]:
+            return self.board_size * self.board_size
+        return action
+
+
+def _state_agent(name, board_size):
+    if name == "goai":
+        ai = GoAI(board_size)
+
+        def choose(state):
+            point = ai.suggest_move(state)  # [y, x]
+            return None if point is None else int(point[1]) * board_size + int(point[0])
+        return StateAgent(board_size, choose)
+    if name == "gopolicy":
+        from ml.policy import GoPolicy
+        policy = GoPolicy(board_size)
+
+        def choose(state):
+            move = policy.choose_action(state)  # (x, y)
+            return None if move is None else move[0] * board_size + move[1]
+        return StateAgent(board_size, choose)
+    from ml.model import GoAIModel
+    return StateAgent(board_size, GoAIModel(board_size=board_size).predict, as_white=True)
+
+
+def _search_budget(argument):
+    """Parse the budget of an "mcts:..." spec: visits ("400"), seconds ("0.5s") or both ("400,0.5s")."""
+    parts = [part for part in argument.split(",") if part]
+    times = [float(part[:-1]) for part in parts if part.endswith("s")]
+    visits = [int(part) for part in parts if not part.endswith("s")]
+    max_time = times[0] if times else None
+    if visits:
+        return visits[0], max_time
+    return (10 ** 9 if times else 200), max_time  # A time budget alone is not capped by visits
+
+
+def make_agent(spec, board_size=9, seed=None):
+    """
+    Build an agent from a short description, for scripts and worker processes:
+        "random"           RandomAgent
+        "heuristic"        HeuristicAgent
+        "mcts" "mcts:400"  MCTSAgent, optionally with its visits per move,
+        "mcts:0.5s"        seconds per move,
+        "mcts:400,0.5s"    or both
+        "ppo:path"         PolicyAgent with a saved PPO model
+        "bc:path"          PolicyAgent with a saved behavior-cloning policy
+        "npz:path"         PolicyAgent with a policy exported by ml/export.py (no torch needed)
+        "goai"             game.ai.GoAI
+        "gopolicy"         ml.policy.GoPolicy
+        "model"            GoAIModel.predict, without a network
+    Every agent has reset(seed=None), which starts a new game (reseeding the agent's
+    randomness when given a seed), and select_action(board), which returns an action
+    (x * size + y, or size * size to pass) for the player to move.
+    """
+    name, _, argument = spec.partition(":")
+    if name == "random":
+        return RandomAgent(board_size, seed)
+    if name == "heuristic":
+        return HeuristicAgent(board_size, seed)
+    if name == "mcts":
+        max_visits, max_time = _search_budget(argument)
+        return MCTSAgent(board_size, seed, max_visits=max_visits, max_time=max_time)
+    if name in ("goai", "gopolicy", "model"):
+        return _state_agent(name, board_size)
+    if name in ("ppo", "bc", "npz"):
+        if not argument:
+            raise ValueError(f"Agent {spec!r} needs a model path, e.g. {name}:go_ai_model")
+        return PolicyAgent(board_size, seed, path=argument, kind=name)
+    raise ValueError(f"Unknown agent: {spec}")
@@ -0,0 +1,299 @@
+"""
+Headless tournaments between agents, to measure strength and catch regressions.
+
+    python ml/arena.py heuristic mcts:200 ppo:go_ai_model --games 400 --workers 8
+    python ml/arena.py ppo:new_model ppo:go_ai_model --games 20000 --sprt 0 10
+
+Players are agent specs (see ml.agents.make_agent), each with its own budget,
+e.g. mcts:400 (visits) or mcts:0.5s (seconds per move). Every pair of players
+meets --games times, swapping colors every game, and every game has a fixed
+seed, so a run with visit budgets can be replayed exactly. Games are played in
+worker processes and scored like self-play games (territory plus captures),
+with a default komi of 0.5 so that none is drawn.
+
+The results are printed as score rates with Wilson confidence intervals for
+every pairing and an Elo table fitted to all games. With two players, --sprt
+ELO0 ELO1 runs a sequential probability ratio test of "the first player is
+ELO1 stronger" against "it is ELO0 stronger", and stops as soon as the games
+decide it.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from ml.agents import make_agent
+from ml.selfplay import play_game
+
+_agents = {}  # (spec, color) -> agent, built once per worker process
+
+
+class _TimedAgent:
+    """Counts the moves of an agent and the time it spends choosing them."""
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.moves = 0
+        self.seconds = 0.0
+
+    def reset(self, seed=None):
+        self.agent.reset(seed)
+
+    def select_action(self, board):
+        start = time.perf_counter()
+        action = self.agent.select_action(board)
+        self.seconds += time.perf_counter() - start
+        self.moves += 1
+        return action
+
+
+def _play(task):
+    """Worker process: play one game of the schedule and return its result."""
+    game, black, white, options = task
+    seed = options["seed"] * 1000003 + game
+    agents = []
+    for color, spec in enumerate((black, white)):
+        key = (spec, color)
+        if key not in _agents:
+            _agents[key] = make_agent(spec, options["board_size"], options["seed"] * 2 + color + 1)
+        agents.append(_TimedAgent(_agents[key]))
+    rng = random.Random(seed)
+    np.random.seed(seed % 2 ** 32)
+    record = play_game(options["board_size"], agents, rng, options["random_opening"],
+                       options["max_moves"], options["komi"], seed)
+    return {
+        "game": game,
+        "black": black,
+        "white": white,
+        "winner": record["winner"],  # +1 black, -1 white, 0 draw
+        "moves": len(record["actions"]),
+        "seconds": [agent.seconds / max(agent.moves, 1) for agent in agents],  # Per move, black and white
+    }
+
+
+def schedule(players, games):
+    """
+    (game, black, white) for games games between every pair of players, colors
+    alternating. Pairings take turns, so a run stopped early is still balanced.
+    """
+    pairs = list(itertools.combinations(players, 2))
+    tasks = []
+    for round_number in range(games):
+        for first, second in pairs:
+            black, white = (first, second) if round_number % 2 == 0 else (second, first)
+            tasks.append((len(tasks), black, white))
+    return tasks
+
+
+def wilson_interval(score, n, z=1.96):
+    """Wilson score interval of a rate observed as score (wins plus half the draws) out of n games."""
+    if n == 0:
+        return 0.0, 1.0
+    p = score / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def elo_difference(p):
+    """Elo difference of a player scoring p against another; clipped away from 0 and 1."""
+    p = min(max(p, 1e-4), 1 - 1e-4)
+    return -400 * math.log10(1 / p - 1) + 0.0  # + 0.0 turns -0.0 into 0.0
+
+
+def expected_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def fit_elo(players, results, iterations=1000):
+    """
+    Bradley-Terry ratings fitted to every game, draws counting as half a win,
+    on the Elo scale with the first player at 0. One virtual draw between every
+    pair keeps a player who won or lost every game finite.
+    """
+    index = {player: i for i, player in enumerate(players)}
+    n = len(players)
+    wins = np.full(n, 0.5 * (n - 1))
+    games = np.ones((n, n)) - np.eye(n)
+    for result in results:
+        b, w = index[result["black"]], index[result["white"]]
+        games[b, w] += 1
+        games[w, b] += 1
+        wins[b] += (1 + result["winner"]) / 2
+        wins[w] += (1 - result["winner"]) / 2
+    strength = np.ones(n)
+    for _ in range(iterations):  # Minorization-maximization (Hunter, 2004)
+        updated = wins / (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        updated /= updated[0]
+        if np.allclose(updated, strength, rtol=1e-9):
+            break
+        strength = updated
+    return 400 * np.log10(strength)
+
+
+class SPRT:
+    """
+    Sequential probability ratio test of H1 "player A is elo1 stronger than B"
+    against H0 "A is elo0 stronger", with error rates alpha (accepting H1 when
+    H0 holds) and beta. Each game is a win of A with the probability its Elo
+    difference predicts; a draw (only possible with an integer komi) counts as
+    half a win and half a loss.
+    """
+
+    def __init__(self, elo0, elo1, alpha=0.05, beta=0.05):
+        self.elo0, self.elo1 = elo0, elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        s0, s1 = expected_score(elo0), expected_score(elo1)
+        self.win_llr = math.log(s1 / s0)
+        self.loss_llr = math.log((1 - s1) / (1 - s0))
+        self.total = 0.0
+
+    def add(self, score):
+        """Add a game that A scored 1, 0.5 or 0 in."""
+        self.total += score * self.win_llr + (1 - score) * self.loss_llr
+
+    def llr(self):
+        return self.total
+
+    def decision(self):
+        """"H1", "H0", or None while the games so far do not decide it."""
+        llr = self.llr()
+        if llr >= self.upper:
+            return "H1"
+        if llr <= self.lower:
+            return "H0"
+        return None
+
+
+def pairing_table(players, results):
+    """Lines with the record of every pairing: first player's wins-draws-losses, score and Elo difference."""
+    lines = []
+    for first, second in itertools.combinations(players, 2):
+        wins = draws = losses = 0
+        for result in results:
+            if {result["black"], result["white"]} != {first, second}:
+                continue
+            outcome = result["winner"] if result["black"] == first else -result["winner"]
+            wins += outcome > 0
+            draws += outcome == 0
+            losses += outcome < 0
+        n = wins + draws + losses
+        if not n:
+            continue
+        score = wins + draws / 2
+        low, high = wilson_interval(score, n)
+        lines.append(f"{first} vs {second}: +{wins} ={draws} -{losses}, score {score / n:.1%} "
+                     f"[{low:.1%}, {high:.1%}], Elo {elo_difference(score / n):+.0f} "
+                     f"[{elo_difference(low):+.0f}, {elo_difference(high):+.0f}]")
+    return lines
+
+
+def elo_table(players, results):
+    ratings = fit_elo(players, results)
+    lines = [f"{'player':<30} {'Elo':>6} {'games':>6} {'score':>6} {'ms/move':>8}"]
+    for i in np.argsort(-ratings):
+        player = players[i]
+        games = [result for result in results if player in (result["black"], result["white"])]
+        score = sum((1 + result["winner"]) / 2 if result["black"] == player else (1 - result["winner"]) / 2
+                    for result in games)
+        seconds = [result["seconds"][0 if result["black"] == player else 1] for result in games]
+        lines.append(f"{player:<30} {ratings[i]:>+6.0f} {len(games):>6} {score / max(len(games), 1):>6.1%} "
+                     f"{1000 * np.mean(seconds) if seconds else 0:>8.1f}")
+    return lines
+
+
+def run(players, games=100, workers=None, board_size=9, random_opening=4, max_moves=None, komi=0.5, seed=0,
+        sprt=None, report_every=30.0):
+    """
+    Play the tournament and print the results. sprt: an SPRT, for two players,
+    that stops the run once decided. Returns the list of game results.
+    """
+    if len(set(players)) != len(players) or len(players) < 2:
+        raise ValueError("The arena needs at least two different players")
+    if sprt is not None and len(players) != 2:
+        raise ValueError("SPRT compares exactly two players")
+    options = {"board_size": board_size, "random_opening": random_opening, "max_moves": max_moves,
+               "komi": komi, "seed": seed}
+    tasks = iter(schedule(players, games))
+    total = games * len(players) * (len(players) - 1) // 2
+    workers = workers or os.cpu_count() or 1
+    results = []
+    decision = None
+    started = last_report = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Only a few games are queued at a time, so an SPRT decision wastes little work
+        running = set()
+        while True:
+            while decision is None and len(running) < 2 * workers:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                running.add(executor.submit(_play, task + (options,)))
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results.append(result)
+                if sprt is not None and decision is None:  # Games still running when it decided are not counted
+                    score = (1 + result["winner"]) / 2
+                    sprt.add(score if result["black"] == players[0] else 1 - score)
+                    decision = decision or sprt.decision()
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                last_report = now
+                line = f"{len(results)}/{total} games, {len(results) * 3600 / (now - started):.0f} games/hour"
+                if sprt is not None:
+                    line += f", LLR {sprt.llr():+.2f} [{sprt.lower:+.2f}, {sprt.upper:+.2f}]"
+                print(line)
+
+    print(f"\n{len(results)} games in {time.perf_counter() - started:.0f}s")
+    print("\n".join(pairing_table(players, results)))
+    print()
+    print("\n".join(elo_table(players, results)))
+    if sprt is not None:
+        verdict = {"H1": f"{players[0]} is stronger by {sprt.elo1:+g} Elo or more (H1)",
+                   "H0": f"{players[0]} is not stronger by {sprt.elo1:+g} Elo (H0: {sprt.elo0:+g})",
+                   None: "undecided: more games are needed"}[decision]
+        print(f"\nSPRT LLR {sprt.llr():+.2f} [{sprt.lower:+.2f}, {sprt.upper:+.2f}]: {verdict}")
+    return sorted(results, key=lambda result: result["game"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("players", nargs="+", help="agent specs: random, heuristic, mcts[:budget], goai, gopolicy, "
+                                                   "model, ppo:path, bc:path or npz:path")
+    parser.add_argument("--games", type=int, default=100, help="games between every pair of players")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--board-size", type=int, default=9)
+    parser.add_argument("--random-opening", type=int, default=4, help="random moves at the start of each game")
+    parser.add_argument("--max-moves", type=int, default=None)
+    parser.add_argument("--komi", type=float, default=0.5, help="points given to White; a half point rules out draws")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sprt", type=float, nargs=2, metavar=("ELO0", "ELO1"),
+                        help="stop when a test of ELO1 against ELO0 (first player minus second) is decided")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--report-every", type=float, default=30.0, help="seconds between progress lines")
+    parser.add_argument("--output", help="write every game result to this JSON file")
+    args = parser.parse_args()
+
+    test = SPRT(*args.sprt, args.alpha, args.beta) if args.sprt else None
+    results = run(args.players, args.games, args.workers, args.board_size, args.random_opening, args.max_moves,
+                  args.komi, args.seed, test, args.report_every)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"players": args.players, "options": vars(args), "games": results}, f, indent=2)
+        print(f"Results written to {args.output}")
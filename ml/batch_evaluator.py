@@ -0,0 +1,115 @@
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class BatchedEvaluator:
+    """
+    Collects leaf positions from concurrent search threads into micro-batches
+    and runs one forward pass per batch.
+
+    A batch is sent as soon as max_batch_size positions are waiting, or
+    max_wait_ms after its first position arrived, whichever comes first.
+    Larger batches amortize the per-call overhead of the network; a longer
+    wait raises throughput at the cost of per-position latency. stats()
+    reports both so the two can be traded off on the target machine.
+
+    predict_batch takes an (n, size, size) array of board states and returns
+    (priors, values): an (n, n_actions) array and an (n,) array. For example
+    GoAIModel.evaluate_batch. An instance is itself a game.ai.MCTS evaluator,
+    so several MCTS searches running in threads can share one:
+
+        evaluator = BatchedEvaluator(go_ai.evaluate_batch, max_batch_size=16)
+        searches = [MCTS(9, evaluator=evaluator) for _ in range(16)]
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait_ms=2.0, latency_window=10000):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = queue.Queue()
+        self.latencies = collections.deque(maxlen=latency_window)  # Seconds from submit to result
+        self.batch_sizes = collections.deque(maxlen=latency_window)
+        self.evaluated = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+        self.closed = False
+        self.worker = threading.Thread(target=self._run, name="batched-evaluator", daemon=True)
+        self.worker.start()
+
+    def submit(self, state):
+        """Queue a board state for evaluation. Returns a Future resolving to (priors, value)."""
+        if self.closed:
+            raise RuntimeError("The evaluator has been closed")
+        future = Future()
+        self.requests.put((np.asarray(state), future, time.perf_counter()))
+        return future
+
+    def evaluate(self, state):
+        """Evaluate one board state, waiting for the batch it joins. Returns (priors, value)."""
+        return self.submit(state).result()
+
+    def __call__(self, board):
+        return self.evaluate(board.get_board_state())
+
+    def _run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = request[2] + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self.requests.put(None)  # Finish this batch, then stop
+                    break
+                batch.append(request)
+            self._evaluate(batch)
+
+    def _evaluate(self, batch):
+        states = np.stack([state for state, _, _ in batch])
+        try:
+            priors, values = self.predict_batch(states)
+        except Exception as error:
+            for _, future, _ in batch:
+                future.set_exception(error)
+            return
+        done = time.perf_counter()
+        for i, (_, future, submitted) in enumerate(batch):
+            future.set_result((priors[i], float(values[i])))
+            self.latencies.append(done - submitted)
+        self.batch_sizes.append(len(batch))
+        self.batches += 1
+        self.evaluated += len(batch)
+
+    def stats(self):
+        """Throughput, batch size and latency percentiles (in milliseconds) so far."""
+        elapsed = time.perf_counter() - self.started
+        latencies = np.array(self.latencies) * 1000.0
+        stats = {
+            "positions": self.evaluated,
+            "batches": self.batches,
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            "positions_per_second": self.evaluated / elapsed if elapsed > 0 else 0.0,
+        }
+        for percentile in (50, 90, 99):
+            stats[f"latency_p{percentile}_ms"] = float(np.percentile(latencies, percentile)) if len(latencies) else 0.0
+        return stats
+
+    def close(self):
+        """Evaluate what is still queued, then stop the worker thread."""
+        if not self.closed:
+            self.closed = True
+            self.requests.put(None)
+            self.worker.join()
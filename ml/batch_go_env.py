@@ -0,0 +1,113 @@
+import numpy as np
+from gym import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from game.batch_board import BatchBoard
+
+
+class BatchGoEnv(VecEnv):
+    """
+    Vectorized counterpart of GoEnv: num_envs games stepped together on one BatchBoard.
+
+    Observations, actions, rewards and episode ends follow GoEnv, but all games
+    advance in a single vectorized step, so stable-baselines3 can use it anywhere
+    it accepts a VecEnv (DummyVecEnv/SubprocVecEnv replacement). Finished games
+    are reset automatically and their last observation is returned in
+    info["terminal_observation"].
+
+    It differs from GoEnv in two ways:
+    - only the simple ko rule is enforced (see BatchBoard), so a move that repeats
+      an earlier position is legal here but illegal in GoEnv, whose Board forbids it;
+    - there is no pass action (GoEnv's allow_pass).
+    """
+
+    def __init__(self, num_envs=8, board_size=9, reward_mode="exact"):
+        """reward_mode: "exact" or "estimate", as in GoEnv (the exact score is always used when a game ends)."""
+        if reward_mode not in ("exact", "estimate"):
+            raise ValueError(f"Unknown reward mode: {reward_mode}")
+        self.board_size = board_size
+        self.reward_mode = reward_mode
+        self.board = BatchBoard(num_envs, board_size)
+        action_space = spaces.Discrete(board_size * board_size)
+        observation_space = spaces.Box(
+            low=0, high=2, shape=(board_size, board_size), dtype=np.int32
+        )
+        super(BatchGoEnv, self).__init__(num_envs, observation_space, action_space)
+        self.actions = None
+
+    def reset(self):
+        """Reset every game and return the initial observations."""
+        self.board.reset()
+        return self._observations()
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions)
+
+    def step_wait(self):
+        """Play one action in every game, returning (observations, rewards, dones, infos)."""
+        # Actions index (x, y) as x * board_size + y, like GoEnv
+        x, y = np.divmod(self.actions, self.board_size)
+        movers = self.board.current_player.copy()
+        legal = self.board.place_stones(y * self.board_size + x)
+
+        full = np.all(self.board.boards != 0, axis=(1, 2))  # Full board ends the game
+        masks = self.action_masks()
+        dones = ~legal | full | ~masks.any(axis=1)  # Also end games with no legal move left
+
+        if self.reward_mode == "exact":
+            black_score, white_score = self.board.calculate_score()
+        else:
+            # The cheap estimate while games go on, the exact score for the games that just ended
+            black_score, white_score = self.board.estimate_score()
+            ended = dones & legal
+            if ended.any():
+                black_score[ended], white_score[ended] = self.board.calculate_score(ended)
+        rewards = np.where(movers == 1, black_score - white_score, white_score - black_score).astype(np.float32)
+        rewards[~legal] = -1  # Penalty for invalid moves
+
+        observations = self._observations()
+        infos = [{"action_mask": mask} for mask in masks]
+        if dones.any():
+            for env in np.flatnonzero(dones):
+                infos[env]["terminal_observation"] = observations[env].copy()
+            self.board.reset(dones)
+            observations[dones] = 0
+            masks[dones] = self.action_masks()[dones]
+        return observations, rewards, dones, infos
+
+    def action_masks(self):
+        """Return a (num_envs, n_actions) boolean mask of the legal actions in every game."""
+        # Actions index (x, y) as x * board_size + y, so the [y, x] board masks are transposed
+        legal = self.board.legal_moves().reshape(self.num_envs, self.board_size, self.board_size)
+        return legal.transpose(0, 2, 1).reshape(self.num_envs, -1)
+
+    def _observations(self):
+        return self.board.boards.astype(np.int32)
+
+    def close(self):
+        pass
+
+    def seed(self, seed=None):
+        return [None] * self.num_envs
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name)] * len(self._get_indices(indices))
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        """
+        Call a method of BatchGoEnv for the given environments. The games have no objects
+        of their own, so the method runs once for all of them: a result with one row per
+        game (like action_masks, which MaskablePPO collects this way) is split into rows,
+        any other result is returned for every index.
+        """
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        indices = self._get_indices(indices)
+        if isinstance(result, np.ndarray) and result.ndim and len(result) == self.num_envs:
+            return [result[i] for i in indices]
+        return [result] * len(indices)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(self._get_indices(indices))
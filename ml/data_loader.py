@@ -0,0 +1,153 @@
+import queue
+import threading
+
+import numpy as np
+
+from game.vector_ops import symmetry_permutations, transform_states
+
+
+def augment(states, actions, symmetries):
+    """Transform each (state, action) pair of a batch by its own symmetry (0-7), one vectorized op per symmetry."""
+    size = states.shape[-1]
+    permutations = symmetry_permutations(size)
+    states = states.copy()
+    actions = permutations[symmetries, actions]
+    for symmetry in range(1, 8):
+        chosen = symmetries == symmetry
+        if chosen.any():
+            states[chosen] = transform_states(states[chosen], symmetry)
+    return states, actions
+
+
+class StreamingLoader:
+    """
+    Streams (state, action) batches from a source of recorded games, for training
+    with imitation's BC, which takes it directly as demonstrations.
+
+    games is a callable returning an iterator over game dicts with "states" and
+    "actions" arrays, such as DemoStore.iter_games or selfplay.iter_games; it is
+    called once per epoch and only read as fast as batches are needed. Positions
+    go through a shuffle buffer of buffer_size positions: once the buffer is full,
+    every new position replaces a random one that goes out, so the order is well
+    mixed while memory stays bounded. Each batch is then turned by a random board
+    symmetry per position (with the actions remapped to match), and batches are
+    prepared on a background thread, up to prefetch ahead of the trainer.
+
+    Iterating yields {"obs": (batch_size, size, size), "acts": (batch_size,)}
+    dicts; the last partial batch of an epoch is dropped. Actions of n_actions
+    or more (passes, for a policy without a pass action) are skipped.
+    """
+
+    def __init__(self, games, batch_size=64, buffer_size=100000, symmetries=True, prefetch=4,
+                 n_actions=None, seed=None):
+        self.games = games
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        self.symmetries = symmetries
+        self.prefetch = prefetch
+        self.n_actions = n_actions
+        self.rng = np.random.default_rng(seed)
+
+    def __iter__(self):
+        batches = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        # Each epoch's thread gets its own generator, derived from the loader's
+        rng = np.random.default_rng(self.rng.integers(2 ** 63))
+        worker = threading.Thread(target=self._produce, args=(batches, stop, rng), name="data-loader", daemon=True)
+        worker.start()
+        try:
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    return
+                if isinstance(batch, Exception):
+                    raise batch
+                yield batch
+        finally:
+            stop.set()  # The trainer stopped early: let the worker exit
+            worker.join()
+
+    def _produce(self, batches, stop, rng):
+        def put(item):
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            for obs, acts in self._batches(rng):
+                if not put({"obs": obs, "acts": acts}):
+                    return
+            put(None)
+        except Exception as error:
+            put(error)
+
+    def _positions(self):
+        """Yield (states, actions) chunks, one per game."""
+        for game in self.games():
+            states = np.asarray(game["states"][:len(game["actions"])])  # Drop a trailing final position
+            actions = np.asarray(game["actions"], dtype=np.int64)
+            if self.n_actions is not None:
+                keep = actions < self.n_actions
+                states, actions = states[keep], actions[keep]
+            if len(actions):
+                yield states, actions
+
+    def _batches(self, rng):
+        buffer_states = buffer_actions = None
+        filled = 0
+        out_states, out_actions, pending = [], [], 0
+
+        for states, actions in self._positions():
+            if buffer_states is None:
+                buffer_states = np.empty((self.buffer_size,) + states.shape[1:], dtype=np.int8)
+                buffer_actions = np.empty(self.buffer_size, dtype=np.int64)
+            # Fill the free part of the buffer first
+            free = min(self.buffer_size - filled, len(actions))
+            buffer_states[filled:filled + free] = states[:free]
+            buffer_actions[filled:filled + free] = actions[:free]
+            filled += free
+            states, actions = states[free:], actions[free:]
+
+            # Swap the rest in for random positions of the full buffer
+            while len(actions):
+                n = min(len(actions), self.buffer_size)
+                slots = rng.choice(self.buffer_size, n, replace=False)
+                out_states.append(buffer_states[slots].copy())
+                out_actions.append(buffer_actions[slots].copy())
+                pending += n
+                buffer_states[slots] = states[:n]
+                buffer_actions[slots] = actions[:n]
+                states, actions = states[n:], actions[n:]
+
+            while pending >= self.batch_size:
+                batch, out_states, out_actions, pending = self._take(out_states, out_actions, pending)
+                yield self._finish(batch, rng)
+
+        # End of the epoch: empty the buffer in random order
+        if filled:
+            order = rng.permutation(filled)
+            out_states.append(buffer_states[order])
+            out_actions.append(buffer_actions[order])
+        if out_actions:
+            states = np.concatenate(out_states)
+            actions = np.concatenate(out_actions)
+            for start in range(0, len(actions) - self.batch_size + 1, self.batch_size):
+                end = start + self.batch_size
+                yield self._finish((states[start:end], actions[start:end]), rng)
+
+    def _take(self, out_states, out_actions, pending):
+        """Split the first batch_size positions off the output chunks."""
+        states = np.concatenate(out_states)
+        actions = np.concatenate(out_actions)
+        size = self.batch_size
+        return (states[:size], actions[:size]), [states[size:]], [actions[size:]], pending - size
+
+    def _finish(self, batch, rng):
+        states, actions = batch
+        if self.symmetries:
+            states, actions = augment(states, actions, rng.integers(0, 8, len(actions)))
+        return states, actions
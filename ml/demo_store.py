@@ -0,0 +1,142 @@
+import json
+import os
+
+import numpy as np
+
+META = "meta.json"
+STATES = "states.bin"
+ACTIONS = "actions.bin"
+INDEX = "index.bin"
+
+
+class DemoStore:
+    """
+    Append-only store of recorded games, read back through np.memmap.
+
+    A store is a directory of flat binary files:
+        states.bin   int8 board states, size * size bytes each. A game of n moves
+                     takes n + 1 states: the position before every move plus the final one.
+        actions.bin  int16 actions (x * size + y), n per game.
+        index.bin    int64 rows (first state, first action, moves, winner) per game,
+                     winner being +1 for black, -1 for white and 0 for a draw or unknown.
+        meta.json    board size and the number of games, states and actions.
+
+    Appending a game only writes to the end of the files; meta.json is rewritten
+    last, so a game cut off half-way is ignored and overwritten by the next append.
+    Only one process should append at a time. Reading maps the files instead of
+    loading them, so stores far larger than memory can be streamed a game at a
+    time (see ml.data_loader.StreamingLoader).
+    """
+
+    def __init__(self, directory, board_size=9):
+        self.directory = directory
+        path = os.path.join(directory, META)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.meta = json.load(f)
+            if self.meta["board_size"] != board_size:
+                raise ValueError(f"{directory} holds {self.meta['board_size']}x{self.meta['board_size']} games, "
+                                 f"not {board_size}x{board_size}")
+        else:
+            self.meta = {"version": 1, "board_size": board_size, "games": 0, "states": 0, "actions": 0}
+        self.board_size = board_size
+        self._maps = None
+
+    def __len__(self):
+        return self.meta["games"]
+
+    @property
+    def positions(self):
+        """Number of (state, action) pairs in the store."""
+        return self.meta["actions"]
+
+    def append_game(self, states, actions, final_state, winner=0):
+        """
+        Append one game: the states before each move, the actions played and the final position.
+        Returns the index of the new game.
+        """
+        states = np.asarray(states, dtype=np.int8).reshape(-1, self.board_size, self.board_size)
+        actions = np.asarray(actions, dtype=np.int16).reshape(-1)
+        if len(states) != len(actions):
+            raise ValueError(f"Need one state per action, got {len(states)} states and {len(actions)} actions")
+        states = np.concatenate([states, np.asarray(final_state, dtype=np.int8)[None]])
+        os.makedirs(self.directory, exist_ok=True)
+
+        row = np.array([self.meta["states"], self.meta["actions"], len(actions), winner], dtype=np.int64)
+        self._append(STATES, states, self.meta["states"] * self.board_size * self.board_size)
+        self._append(ACTIONS, actions, self.meta["actions"] * 2)
+        self._append(INDEX, row, self.meta["games"] * row.nbytes)
+
+        self.meta["games"] += 1
+        self.meta["states"] += len(states)
+        self.meta["actions"] += len(actions)
+        temporary = os.path.join(self.directory, META + ".tmp")
+        with open(temporary, "w") as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(temporary, os.path.join(self.directory, META))
+        self._maps = None  # The files grew
+        return self.meta["games"] - 1
+
+    def _append(self, name, array, committed_bytes):
+        path = os.path.join(self.directory, name)
+        mode = "r+b" if os.path.exists(path) else "wb"
+        with open(path, mode) as f:
+            f.truncate(committed_bytes)  # Drop anything left by an interrupted append
+            f.seek(committed_bytes)
+            f.write(array.tobytes())
+
+    def import_npz(self, path):
+        """
+        Append the game in a demos.npz written by older versions of the GUI.
+        The last recorded state stands in for the final position, so the last action is dropped.
+        """
+        data = np.load(path)
+        states, actions = data["states"], data["actions"]
+        if len(states) < 2:
+            return None
+        return self.append_game(states[:-1], actions[:len(states) - 1], states[-1])
+
+    def _memmaps(self):
+        if self._maps is None:
+            size = self.board_size
+            meta = self.meta
+
+            def open_map(name, dtype, shape):
+                if not shape[0]:
+                    return np.zeros(shape, dtype=dtype)  # np.memmap cannot map an empty file
+                return np.memmap(os.path.join(self.directory, name), dtype=dtype, mode="r", shape=shape)
+
+            self._maps = (open_map(STATES, np.int8, (meta["states"], size, size)),
+                          open_map(ACTIONS, np.int16, (meta["actions"],)),
+                          open_map(INDEX, np.int64, (meta["games"], 4)))
+        return self._maps
+
+    @property
+    def states(self):
+        return self._memmaps()[0]
+
+    @property
+    def actions(self):
+        return self._memmaps()[1]
+
+    @property
+    def index(self):
+        return self._memmaps()[2]
+
+    def game(self, i):
+        """
+        One game as a dict: states (moves + 1 positions, memory-mapped), actions and winner.
+        The states fit imitation.data.types.Trajectory(obs=states, acts=actions, ...) as they are.
+        """
+        first_state, first_action, moves, winner = (int(value) for value in self.index[i])
+        return {
+            "states": self.states[first_state:first_state + moves + 1],
+            "actions": self.actions[first_action:first_action + moves],
+            "winner": winner,
+        }
+
+    def iter_games(self, rng=None):
+        """Yield every game, in random order when given a numpy Generator."""
+        order = rng.permutation(len(self)) if rng is not None else range(len(self))
+        for i in order:
+            yield self.game(i)
@@ -0,0 +1,199 @@
+"""
+Export a trained policy to a NumPy weight file that ml.numpy_policy.NumpyPolicy
+plays with, without torch or stable-baselines3:
+
+    python ml/export.py --model ml/go_ai_model --out ml/go_policy.npz
+    python ml/export.py --model ml/go_bc_policy --kind bc --out ml/go_policy.npz --dtype int8
+
+--dtype float16 halves the file and int8 quarters it (one float32 scale per
+output keeps the error small). --report compares latency, footprint and moves
+of the torch policy and the NumPy one in every dtype, on positions from random games.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from ml.agents import RandomAgent
+from ml.numpy_policy import ACTIVATIONS, NumpyPolicy
+from ml.selfplay import play_game
+
+DTYPES = ("float32", "float16", "int8")
+
+
+def load_policy(path, kind="ppo"):
+    """Load the policy of a PPO model saved by train.py / ppo_finetune.py, or the one saved by imitation_train.py."""
+    from stable_baselines3 import PPO
+    from stable_baselines3.common.policies import ActorCriticPolicy
+
+    if kind == "bc":
+        policy = ActorCriticPolicy.load(path)
+    else:
+        policy = PPO.load(path, device="cpu").policy
+    policy.set_training_mode(False)
+    return policy
+
+
+def _linear_layers(state_dict, prefix):
+    """[(weight, bias)] of the Linear layers under prefix (an nn.Sequential), in order."""
+    indices = sorted({int(match.group(1)) for name in state_dict
+                      for match in [re.fullmatch(re.escape(prefix) + r"\.(\d+)\.weight", name)] if match})
+    return [(state_dict[f"{prefix}.{i}.weight"], state_dict[f"{prefix}.{i}.bias"]) for i in indices]
+
+
+def quantize(weight, dtype):
+    """Return (stored weight, scale or None) for an (in, out) float32 weight."""
+    if dtype == "int8":
+        scale = np.abs(weight).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        return np.round(weight / scale).astype(np.int8), scale.astype(np.float32)
+    return weight.astype(dtype), None
+
+
+def export_arrays(policy, board_size, dtype="float32"):
+    """The arrays of the weight file for an MlpPolicy, as loaded by NumpyPolicy."""
+    activation = policy.activation_fn.__name__.lower()
+    if activation not in ACTIVATIONS:
+        raise ValueError(f"Cannot export a policy with {policy.activation_fn.__name__} activations")
+    state_dict = {name: tensor.detach().cpu().numpy().astype(np.float32)
+                  for name, tensor in policy.state_dict().items()}
+    # Older stable-baselines3 versions have layers shared by both heads in shared_net
+    shared = _linear_layers(state_dict, "mlp_extractor.shared_net")
+    networks = {
+        "pi": shared + _linear_layers(state_dict, "mlp_extractor.policy_net"),
+        "vf": shared + _linear_layers(state_dict, "mlp_extractor.value_net"),
+    }
+    layers = {f"{net}.{i}": layer for net, net_layers in networks.items() for i, layer in enumerate(net_layers)}
+    layers["action"] = (state_dict["action_net.weight"], state_dict["action_net.bias"])
+    layers["value"] = (state_dict["value_net.weight"], state_dict["value_net.bias"])
+
+    meta = {
+        "board_size": board_size,
+        "n_actions": int(policy.action_space.n),
+        "activation": activation,
+        "dtype": dtype,
+        "pi_layers": len(networks["pi"]),
+        "vf_layers": len(networks["vf"]),
+    }
+    arrays = {"meta": np.array(json.dumps(meta))}
+    for name, (weight, bias) in layers.items():
+        stored, scale = quantize(weight.T, dtype)  # torch keeps (out, in); the forward pass multiplies x @ (in, out)
+        arrays[f"{name}.weight"] = stored
+        arrays[f"{name}.bias"] = bias
+        if scale is not None:
+            arrays[f"{name}.scale"] = scale
+    return arrays
+
+
+def file_size(arrays):
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.tell()
+
+
+def random_positions(board_size, games=20, seed=0):
+    """Board states from random games, as a (n, size, size) array."""
+    rng = random.Random(seed)
+    agents = [RandomAgent(board_size, seed), RandomAgent(board_size, seed + 1)]
+    return np.concatenate([play_game(board_size, agents, rng)["states"] for _ in range(games)])
+
+
+def time_per_call(function, argument, repeat):
+    """Best microseconds per call over a few rounds of `repeat` calls."""
+    function(argument)
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function(argument)
+        best = min(best, (time.perf_counter() - start) * 1e6 / repeat)
+    return best
+
+
+def peak_memory_mb(code):
+    """Peak resident memory of a new Python process running code, in MB (Unix only)."""
+    script = code + "\nimport resource; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True)
+    if result.returncode:
+        return None
+    return int(result.stdout.split()[-1]) / 1024  # ru_maxrss is in KB on Linux
+
+
+def report(policy, model_path, kind, board_size, export_path, batch_size=256):
+    """Print latency, footprint and agreement of the torch policy and its NumPy exports."""
+    import torch
+
+    states = random_positions(board_size)
+    batch = states[:batch_size]
+
+    def torch_probs(states):
+        obs, _ = policy.obs_to_tensor(states)
+        with torch.no_grad():
+            return policy.get_distribution(obs).distribution.probs.cpu().numpy(), policy.predict_values(obs)
+
+    reference = torch_probs(states)[0]
+    empty = (states == 0).transpose(0, 2, 1).reshape(len(states), -1)
+    reference_moves = np.argmax(np.where(empty, reference[:, :board_size * board_size], -1.0), axis=1)
+
+    params = sum(p.numel() * p.element_size() for p in policy.parameters())
+    rows = [("torch", params, os.path.getsize(model_path) if os.path.exists(model_path) else None,
+             time_per_call(torch_probs, states[:1], 200), time_per_call(torch_probs, batch, 20), 1.0, 0.0)]
+    for dtype in DTYPES:
+        arrays = export_arrays(policy, board_size, dtype)
+        numpy_policy = NumpyPolicy(arrays)
+        probs, _ = numpy_policy.evaluate_batch(states)
+        moves = np.array([-1 if move is None else move for move in numpy_policy.predict(states)])
+        rows.append((f"numpy {dtype}", numpy_policy.nbytes, file_size(arrays),
+                     time_per_call(numpy_policy.predict, states[0], 2000),
+                     time_per_call(numpy_policy.evaluate_batch, batch, 200),
+                     float(np.mean(moves == reference_moves)),
+                     float(np.abs(probs[:, :reference.shape[1]] - reference).max())))
+
+    print(f"{len(states)} positions from random games; batches of {len(batch)}")
+    print(f"{'backend':<15} {'weights KB':>10} {'file KB':>8} {'1 pos us':>9} {'batch us/pos':>12} "
+          f"{'same move':>9} {'max |dp|':>9}")
+    for name, params, size, single, batched, agreement, error in rows:
+        size = f"{size / 1024:>8.1f}" if size is not None else f"{'-':>8}"
+        print(f"{name:<15} {params / 1024:>10.1f} {size} {single:>9.1f} {batched / len(batch):>12.2f} "
+              f"{agreement:>9.1%} {error:>9.5f}")
+
+    model_path, export_path = os.path.abspath(model_path), os.path.abspath(export_path)
+    torch_memory = peak_memory_mb(f"from ml.export import load_policy; load_policy({model_path!r}, {kind!r})")
+    numpy_memory = peak_memory_mb(f"from ml.numpy_policy import NumpyPolicy; NumpyPolicy.load({export_path!r})")
+    if torch_memory and numpy_memory:
+        print(f"Peak process memory: {torch_memory:.0f} MB with torch, {numpy_memory:.0f} MB with NumPy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="go_ai_model", help="saved PPO model or behavior-cloning policy")
+    parser.add_argument("--kind", choices=["ppo", "bc"], default="ppo")
+    parser.add_argument("--out", default="go_policy.npz")
+    parser.add_argument("--dtype", choices=DTYPES, default="float32")
+    parser.add_argument("--board-size", type=int, default=9)
+    parser.add_argument("--report", action="store_true", help="compare the torch and NumPy backends")
+    args = parser.parse_args()
+
+    if not args.out.endswith(".npz"):
+        args.out += ".npz"  # np.savez would add it, and the size and report below need the real name
+    policy = load_policy(args.model, args.kind)
+    arrays = export_arrays(policy, args.board_size, args.dtype)
+    np.savez(args.out, **arrays)
+    print(f"Exported {args.model} to {args.out} ({args.dtype}, {os.path.getsize(args.out) / 1024:.1f} KB)")
+    if args.report:
+        model_path = args.model if args.kind == "bc" or args.model.endswith(".zip") else args.model + ".zip"
+        report(policy, model_path, args.kind, args.board_size, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,41 +6,82 @@ from game.board import Board
 
 class GoEnv(gym.Env):
     """Custom environment for training an AI to play Go."""
-    def __init__(self, board_size=9):
+    def __init__(self, board_size=9, allow_pass=False, reward_mode="exact"):
+        """
+        allow_pass: add a pass action (index board_size * board_size); two passes in a row end the game.
+        reward_mode: "exact" scores every step with Board.calculate_score, "estimate" uses the
+        O(1) Board.estimate_score during the game and the exact score only when it ends.
+        """
         super(GoEnv, self).__init__()
+        if reward_mode not in ("exact", "estimate"):
+            raise ValueError(f"Unknown reward mode: {reward_mode}")
         self.board_size = board_size
+        self.allow_pass = allow_pass
+        self.reward_mode = reward_mode
         self.board = Board(board_size)
-        self.action_space = spaces.Discrete(board_size * board_size)  # Possible moves
+        n_actions = board_size * board_size + (1 if allow_pass else 0)
+        self.action_space = spaces.Discrete(n_actions)  # Possible moves
         self.observation_space = spaces.Box(
             low=0, high=2, shape=(board_size, board_size), dtype=np.int32
         )
         self.current_player = 1  # Black starts
+        self.consecutive_passes = 0
+        self._mask = self._legal_actions()  # Legal actions of the player to move, updated once per step
 
     def reset(self):
         """Reset the environment to its initial state."""
         self.board.reset_board()
         self.current_player = 1
+        self.consecutive_passes = 0
+        self._mask = self._legal_actions()
         return self.board.get_board_state()
 
+    def action_masks(self):
+        """Return a boolean mask of the legal actions for the player to move."""
+        return self._mask.copy()
+
+    def _legal_actions(self):
+        # Actions index (x, y) as x * board_size + y, so the [y, x] board mask is transposed
+        mask = self.board.legal_moves().T.ravel()
+        if self.allow_pass:
+            mask = np.append(mask, True)
+        return mask
+
     def step(self, action):
         """Take a step in the environment."""
-        x, y = divmod(action, self.board_size)
+        if self.allow_pass and action == self.board_size * self.board_size:
+            self.board.play(None, None)
+            self.consecutive_passes += 1
+            done = self.consecutive_passes >= 2  # Both players passed
+        else:
+            x, y = divmod(action, self.board_size)
+
+            # Handle invalid moves
+            if not self.board.place_stone(x, y):
+                return self.board.get_board_state(), -1, True, {}  # Penalty for invalid moves
+
+            self.consecutive_passes = 0
+            # Check for game end condition
+            done = np.all(self.board.get_board_state() != 0)  # Full board ends the game
 
-        # Handle invalid moves
-        if not self.board.place_stone(x, y):
-            return self.board.get_board_state(), -1, True, {}  # Penalty for invalid moves
+        # Expose the next player's legal moves so masked policies never pick an illegal one
+        self._mask = self._legal_actions()
+        action_mask = self.action_masks()
+        if not action_mask.any():
+            done = True  # No legal move left and passing is not allowed
 
-        # Check for game end condition
-        done = np.all(self.board.get_board_state() != 0)  # Full board ends the game
-        reward = self.calculate_reward()
+        reward = self.calculate_reward(exact=done or self.reward_mode == "exact")
 
         # Switch player
         self.current_player = 3 - self.current_player
-        return self.board.get_board_state(), reward, done, {}
+        return self.board.get_board_state(), reward, done, {"action_mask": action_mask}
 
-    def calculate_reward(self):
+    def calculate_reward(self, exact=True):
         """Calculate reward for the current player."""
-        black_score, white_score = self.board.calculate_score()
+        if exact:
+            black_score, white_score = self.board.calculate_score()
+        else:
+            black_score, white_score = self.board.estimate_score()
         return black_score - white_score if self.current_player == 1 else white_score - black_score
 
     def render(self, mode="human"):
@@ -2,52 +2,60 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
 
+import argparse
+
 import numpy as np
 from stable_baselines3 import PPO
 from ml.go_env import GoEnv
+from ml.data_loader import StreamingLoader
+from ml.demo_store import DemoStore
+from ml.selfplay import iter_games
 
 from imitation.algorithms.bc import BC
-from imitation.data.types import Trajectory
-from imitation.data import rollout
 
-# Load your demonstration data
-data_path = "data/demos.npz"
-if not os.path.exists(data_path):
-    raise FileNotFoundError("No demos.npz file found. Play a game first to generate demonstrations.")
+parser = argparse.ArgumentParser(description="Behavior cloning from GUI games or self-play games.")
+parser.add_argument("--store", default="data/demos", help="demonstration store written by the GUI")
+parser.add_argument("--selfplay", help="directory written by selfplay.py to train on instead of the store")
+parser.add_argument("--batch-size", type=int, default=32)
+parser.add_argument("--epochs", type=int, default=50)
+parser.add_argument("--buffer-size", type=int, default=100000, help="positions held in the shuffle buffer")
+parser.add_argument("--no-symmetries", dest="symmetries", action="store_false",
+                    help="train on the positions as played, without random rotations and reflections")
+args = parser.parse_args()
 
-data = np.load(data_path)
-states = data["states"]    # shape: (num_steps, board_size, board_size)
-actions = data["actions"]  # shape: (num_steps,)
+# Board size, and the number of actions the policy has (no pass action)
+board_size = 9
+n_actions = board_size * board_size
 
-if len(states) == 0 or len(actions) == 0:
-    raise ValueError("The demonstrations file is empty. Play a game with moves before ending it.")
+# Games are visited in a new random order every epoch
+order_rng = np.random.default_rng()
 
-# Ensure we have one more observation than actions
-if len(states) == len(actions):
-    # Remove the last action to meet the requirement obs = acts + 1
-    actions = actions[:-1]
+if args.selfplay:
+    if not os.path.exists(os.path.join(args.selfplay, "manifest.json")):
+        raise FileNotFoundError(f"No self-play games found in {args.selfplay}. Run selfplay.py first.")
+    games = lambda: iter_games(args.selfplay, order_rng)
+    print(f"Training on self-play games from {args.selfplay}")
+else:
+    store = DemoStore(args.store, board_size)
 
-if len(states) != len(actions) + 1:
-    raise ValueError(
-        f"Number of states must be exactly one more than number of actions. "
-        f"states: {len(states)}, actions: {len(actions)}"
-    )
+    # Bring in the single game saved by older versions of the GUI
+    legacy_path = "data/demos.npz"
+    if not len(store) and os.path.exists(legacy_path):
+        if store.import_npz(legacy_path) is not None:
+            print(f"Imported {legacy_path} into {args.store}")
 
-# Create infos as empty dictionaries, one per action
-infos = [{} for _ in range(len(actions))]
+    if store.positions == 0:
+        raise ValueError(f"No demonstrations found in {args.store}. Play a game first and end it to save it.")
+    print(f"Training on {len(store)} games ({store.positions} positions) from {args.store}")
+    games = lambda: store.iter_games(order_rng)
+    args.batch_size = min(args.batch_size, store.positions)
 
-# Construct a single trajectory
-trajectory = Trajectory(
-    obs=states,
-    acts=actions,
-    infos=infos,
-    terminal=True
-)
-
-demonstrations = rollout.flatten_trajectories([trajectory])
+# Games are read lazily, shuffled through a bounded buffer and randomly rotated/reflected on a
+# background thread, so the data may be larger than RAM; passes are skipped since the policy cannot play them
+demonstrations = StreamingLoader(games, batch_size=args.batch_size, buffer_size=args.buffer_size,
+                                 symmetries=args.symmetries, n_actions=n_actions)
 
 # Initialize environment and a dummy PPO model (just for policy initialization)
-board_size = 9
 env = GoEnv(board_size=board_size)
 model = PPO("MlpPolicy", env, verbose=1)
 
@@ -59,13 +67,14 @@ bc_trainer = BC(
     observation_space=model.policy.observation_space,
     action_space=model.policy.action_space,
     demonstrations=demonstrations,
+    batch_size=args.batch_size,
     policy=model.policy,
     rng=rng
 )
 
 # Train the policy using Behavior Cloning
 print("Starting Behavior Cloning training...")
-bc_trainer.train(n_epochs=50)
+bc_trainer.train(n_epochs=args.epochs)
 print("BC training completed.")
 
 # Save the BC-initialized policy
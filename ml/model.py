@@ -1,15 +1,51 @@
-from stable_baselines3 import PPO
+import logging
+
 import numpy as np
 
+from game.heuristics import score_moves
+from game.transposition import EvaluationCache
+
+logger = logging.getLogger(__name__)
+
+# stable-baselines3 and torch take seconds to import, so they are only imported
+# once a network is built, loaded or evaluated: predict() works without them.
+
+def load_ppo():
+    """Import PPO from stable-baselines3."""
+    from stable_baselines3 import PPO
+    return PPO
+
+
+def load_maskable_ppo():
+    """Import MaskablePPO from sb3-contrib, which is only needed for action-masked training."""
+    try:
+        from sb3_contrib import MaskablePPO
+    except ImportError:
+        raise ImportError("Action-masked training needs sb3-contrib: pip install sb3-contrib")
+    return MaskablePPO
+
+
 class GoAIModel:
-    def __init__(self, env, board_size):
-        """Initialize the model with a given environment and board size."""
-        self.model = PPO("MlpPolicy", env, verbose=1)
+    def __init__(self, env=None, board_size=9, masked=False, **ppo_kwargs):
+        """
+        Initialize the model with a given environment and board size.
+        env: the training environment. With None no network is built, for a model
+        that only predicts or is about to load() a saved one.
+        masked: train with MaskablePPO, which only samples the legal actions reported by env.action_masks().
+        ppo_kwargs: extra PPO hyperparameters such as n_steps or batch_size.
+        """
+        self.masked = masked
         self.board_size = board_size
+        self.model = None
+        if env is not None:
+            self.model = self.algorithm()("MlpPolicy", env, verbose=1, **ppo_kwargs)
+
+    def algorithm(self):
+        return load_maskable_ppo() if self.masked else load_ppo()
 
-    def train(self, timesteps=10000):
+    def train(self, timesteps=10000, callback=None):
         """Train the model."""
-        self.model.learn(total_timesteps=timesteps)
+        self.model.learn(total_timesteps=timesteps, callback=callback)
 
     def save(self, path="go_ai_model"):
         """Save the trained model."""
@@ -17,46 +53,58 @@ class GoAIModel:
 
     def load(self, path="go_ai_model"):
         """Load a pre-trained model."""
-        self.model = PPO.load(path)
+        self.model = self.algorithm().load(path)
+
+    def evaluate_position(self, board):
+        """
+        Search evaluator backed by the trained policy (see game.ai.MCTS).
+        Returns (priors over every action plus pass, value in [-1, 1] for the player to move).
+        """
+        priors, values = self.evaluate_batch(board.get_board_state()[None])
+        return priors[0], float(values[0])
+
+    def cached_evaluator(self, max_entries=100000):
+        """
+        evaluate_position behind an EvaluationCache, so repeated, transposed and symmetric
+        positions cost one forward pass. Make a new one after training or loading weights.
+        """
+        return EvaluationCache(self.evaluate_position, max_entries)
+
+    def evaluate_batch(self, states):
+        """Evaluate an (n, size, size) array of board states in one forward pass. Returns (priors, values)."""
+        import torch
+
+        policy = self.model.policy
+        obs, _ = policy.obs_to_tensor(np.asarray(states))
+        with torch.no_grad():
+            probs = policy.get_distribution(obs).distribution.probs.cpu().numpy()
+            values = policy.predict_values(obs)[:, 0].cpu().numpy()
+        if probs.shape[1] == self.board_size * self.board_size:
+            probs = np.concatenate([probs, np.zeros((len(probs), 1), dtype=probs.dtype)], axis=1)  # No pass action
+        # The value head predicts a score margin; squash it into [-1, 1]
+        return probs, np.tanh(values / self.board_size)
 
     def predict(self, state):
         """Predict the next move based on the current state."""
-        valid_moves = []
-        for x in range(self.board_size):
-            for y in range(self.board_size):
-                if state[y][x] == 0:  # Empty position
-                    valid_moves.append((x, y))
-
-        if not valid_moves:  # No valid moves left
-            print("AI decided to pass. No valid moves available.")
+        # Score every point at once; flatten as [x, y] so the index is the action x * size + y
+        scores = score_moves(state, player=2).T.ravel()  # AI is player 2 (White)
+        if np.isneginf(scores).all():  # No valid moves left
+            logger.debug("AI decided to pass. No valid moves available.")
             return None
 
-        # Evaluate valid moves
-        best_action = None
-        highest_score = -float('inf')
-
-        print("AI is evaluating moves...")
-        for x, y in valid_moves:
-            action = x * self.board_size + y
-
-            # Evaluate move using simple heuristics
-            score = self.evaluate_move(state, x, y)
-            print(f"Evaluated move ({x}, {y}): Score = {score}")
-
-            if score > highest_score:
-                highest_score = score
-                best_action = action
+        # Ties go to the lowest action, as in evaluating the moves one by one
+        best_action = int(np.argmax(scores))
+        highest_score = scores[best_action]
 
         # Pass if no move scores higher than a threshold
         if highest_score <= 0:
-            print("AI passed. No beneficial move found.")
+            logger.debug("AI passed. No beneficial move found.")
             return None
 
         best_x, best_y = divmod(best_action, self.board_size)
-        print(f"AI chose move ({best_x}, {best_y}) with score {highest_score}")
+        logger.debug(f"AI chose move ({best_x}, {best_y}) with score {highest_score}")
         return best_action
 
-
     def evaluate_move(self, state, x, y):
         """Evaluate the quality of a move using simple heuristics."""
         simulated_state = state.copy()
@@ -68,7 +116,7 @@ class GoAIModel:
         self_capture_penalty = -10 if self.would_self_capture(simulated_state, x, y) else 0
 
         # Log evaluation details
-        print(f"Move ({x}, {y}): Liberties = {liberty_count}, Captures = {capture_score}, Self-Capture Penalty = {self_capture_penalty}")
+        logger.debug(f"Move ({x}, {y}): Liberties = {liberty_count}, Captures = {capture_score}, Self-Capture Penalty = {self_capture_penalty}")
         return liberty_count + capture_score + self_capture_penalty
 
 
@@ -139,7 +187,7 @@ if __name__ == "__main__":
 
     # Create environment and load model
     env = DummyVecEnv([lambda: GoEnv(board_size=9)])
-    go_ai = GoAIModel(env)
+    go_ai = GoAIModel(board_size=9)
     go_ai.load("go_ai_model")
 
     # Test prediction
@@ -0,0 +1,109 @@
+import json
+
+import numpy as np
+
+from game.transposition import EvaluationCache
+
+ACTIVATIONS = {
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0.0),
+}
+
+
+class NumpyPolicy:
+    """
+    Forward pass of a stable-baselines3 MlpPolicy exported by ml/export.py, in
+    plain NumPy: no torch or stable-baselines3 needed to play.
+
+    Weights are kept as exported (float32, float16, or int8 with a float32
+    scale per output) and widened to float32 one layer at a time, so a
+    quantized policy also stays small in memory. Inputs follow GoEnv
+    observations: [y, x] board states with 0 empty, 1 black, 2 white.
+
+    predict() has the interface of GoAIModel.predict, evaluate_batch() and
+    evaluate_position() that of the GoAIModel evaluators, so it can stand in
+    for the model in the search (game.ai.MCTS) and BatchedEvaluator.
+    """
+
+    def __init__(self, arrays):
+        """arrays: the contents of an exported file (see ml.export.export_arrays)."""
+        meta = json.loads(str(arrays["meta"]))
+        self.board_size = meta["board_size"]
+        self.n_actions = meta["n_actions"]
+        self.dtype = meta["dtype"]
+        self.activation = ACTIVATIONS[meta["activation"]]
+        self.policy_layers = [self._layer(arrays, f"pi.{i}") for i in range(meta["pi_layers"])]
+        self.value_layers = [self._layer(arrays, f"vf.{i}") for i in range(meta["vf_layers"])]
+        self.action_head = self._layer(arrays, "action")
+        self.value_head = self._layer(arrays, "value")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files})
+
+    @staticmethod
+    def _layer(arrays, name):
+        scale = arrays.get(f"{name}.scale")
+        return arrays[f"{name}.weight"], scale, arrays[f"{name}.bias"]
+
+    @property
+    def nbytes(self):
+        """Memory held by the weights."""
+        layers = self.policy_layers + self.value_layers + [self.action_head, self.value_head]
+        return sum(array.nbytes for layer in layers for array in layer if array is not None)
+
+    def _dense(self, x, layer):
+        weight, scale, bias = layer
+        y = x @ weight.astype(np.float32, copy=False)
+        if scale is not None:
+            y *= scale
+        return y + bias
+
+    def forward(self, states):
+        """Return (logits, values) for an (n, size, size) array of board states."""
+        x = np.asarray(states, dtype=np.float32).reshape(len(states), -1)
+        pi = vf = x
+        for layer in self.policy_layers:
+            pi = self.activation(self._dense(pi, layer))
+        for layer in self.value_layers:
+            vf = self.activation(self._dense(vf, layer))
+        return self._dense(pi, self.action_head), self._dense(vf, self.value_head)[:, 0]
+
+    def evaluate_batch(self, states):
+        """Evaluate an (n, size, size) array of board states, like GoAIModel.evaluate_batch. Returns (priors, values)."""
+        logits, values = self.forward(states)
+        probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs /= probs.sum(axis=1, keepdims=True)
+        if probs.shape[1] == self.board_size * self.board_size:
+            probs = np.concatenate([probs, np.zeros((len(probs), 1), dtype=probs.dtype)], axis=1)  # No pass action
+        # The value head predicts a score margin; squash it into [-1, 1]
+        return probs, np.tanh(values / self.board_size)
+
+    def evaluate_position(self, board):
+        """Search evaluator (see game.ai.MCTS): (priors over every action plus pass, value for the player to move)."""
+        priors, values = self.evaluate_batch(board.get_board_state()[None])
+        return priors[0], float(values[0])
+
+    def cached_evaluator(self, max_entries=100000):
+        """evaluate_position behind an EvaluationCache."""
+        return EvaluationCache(self.evaluate_position, max_entries)
+
+    def predict(self, state):
+        """
+        The policy's most likely move on an empty point, as an action (x * size + y),
+        or None to pass. Given an (n, size, size) batch, returns a list of n moves.
+        """
+        states = np.asarray(state)
+        single = states.ndim == 2
+        if single:
+            states = states[None]
+        logits, _ = self.forward(states)
+        size = self.board_size
+        # Only empty points are playable; flatten as [x, y] so the index is the action x * size + y
+        empty = (states == 0).transpose(0, 2, 1).reshape(len(states), size * size)
+        logits[:, :size * size][~empty] = -np.inf
+        actions = np.argmax(logits, axis=1)
+        moves = [None if action >= size * size or not empty[i].any() else int(action)
+                 for i, action in enumerate(actions)]
+        return moves[0] if single else moves
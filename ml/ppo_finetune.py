@@ -3,23 +3,32 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
 
 from stable_baselines3 import PPO
-from ml.go_env import GoEnv
+from stable_baselines3.common.policies import ActorCriticPolicy
+from ml.model import load_maskable_ppo
+from ml.training import ThroughputCallback, make_vec_env, parse_training_args, ppo_kwargs, training_parser
 
-board_size = 9
-env = GoEnv(board_size=board_size)
 
-# Initialize a PPO model
-model = PPO("MlpPolicy", env, verbose=1)
+if __name__ == "__main__":
+    parser = training_parser("Fine-tune the behavior-cloned policy with PPO.", output="go_ai_model")
+    parser.add_argument("--bc-policy", default="go_bc_policy", help="policy saved by imitation_train.py")
+    args = parse_training_args(parser)
 
-# Load the BC-trained weights into the PPO model's policy
-model.policy.load("go_bc_policy")
+    env = make_vec_env(args)
 
-# Now continue training with PPO
-timesteps = 100000  # Adjust this as desired
-print(f"Continuing training for {timesteps} timesteps using PPO...")
-model.learn(total_timesteps=timesteps)
+    # Initialize a PPO model
+    # Action masks (needs sb3-contrib) sample only legal moves instead of ending episodes on illegal ones
+    algorithm = load_maskable_ppo() if args.action_masks else PPO
+    model = algorithm("MlpPolicy", env, verbose=1, **ppo_kwargs(args))
 
-# Save the refined model
-model_path = "go_ai_model"
-model.save(model_path)
-print(f"Refined model saved to {model_path}")
+    # Load the BC-trained weights into the PPO model's policy (the maskable policy has the same layers)
+    bc_policy = ActorCriticPolicy.load(args.bc_policy)
+    model.policy.load_state_dict(bc_policy.state_dict())
+
+    # Now continue training with PPO
+    print(f"Continuing training for {args.timesteps} timesteps using PPO on {args.n_envs} {args.vec_env} environments...")
+    model.learn(total_timesteps=args.timesteps, callback=ThroughputCallback())
+
+    # Save the refined model
+    model.save(args.output)
+    print(f"Refined model saved to {args.output}")
+    env.close()
@@ -0,0 +1,280 @@
+"""
+Headless self-play: play many games in parallel worker processes and write
+every position, the move played and the game's outcome to shard files.
+
+    python ml/selfplay.py --out ml/data/selfplay --games 100000 --workers 8 \
+        --black heuristic --white mcts:200
+
+The output directory holds numbered shards (shard-00000.npz, ...) and a
+manifest.json listing them. Running the same command again resumes where the
+last run stopped, until the manifest holds --games games. Shards are read back
+with iter_games(), which imitation_train.py uses.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from game.board import Board
+from ml.agents import make_agent
+
+MANIFEST = "manifest.json"
+
+
+def play_game(board_size, agents, rng, random_opening=0, max_moves=None, komi=0, seed=None):
+    """
+    Play one game between two agents (black first) until two passes in a row or max_moves.
+    The first random_opening moves are random legal moves, so that games differ.
+    seed: reseeds the agents (with seed * 2 + color index), so that the game does
+    not depend on the games the agents played before.
+    Returns the game record as a dict of arrays.
+    """
+    if max_moves is None:
+        max_moves = 3 * board_size * board_size
+    pass_action = board_size * board_size
+    board = Board(board_size)
+    for color, agent in enumerate(agents):
+        agent.reset(None if seed is None else seed * 2 + color)
+    states, actions, players = [], [], []
+    passes = 0
+    while passes < 2 and len(actions) < max_moves:
+        if len(actions) < random_opening:
+            legal = np.flatnonzero(board.legal_moves().T.ravel())
+            action = int(legal[rng.randrange(len(legal))]) if len(legal) else pass_action
+        else:
+            action = agents[board.current_player - 1].select_action(board)
+        states.append(board.get_board_state().astype(np.int8))
+        actions.append(action)
+        players.append(board.current_player)
+        if action == pass_action:
+            board.play(None, None)
+            passes += 1
+        elif board.play(*divmod(action, board_size)):
+            passes = 0
+        else:
+            raise ValueError(f"Agent {board.current_player} played an illegal move: {action}")
+
+    black_score, white_score = board.calculate_score()
+    winner = int(np.sign(black_score - white_score - komi))  # +1 black, -1 white, 0 draw
+    players = np.array(players, dtype=np.int8)
+    return {
+        "states": np.array(states, dtype=np.int8).reshape(-1, board_size, board_size),
+        "actions": np.array(actions, dtype=np.int16),
+        "players": players,
+        "outcomes": np.where(players == 1, winner, -winner).astype(np.int8),  # For the player to move
+        "final_state": board.get_board_state().astype(np.int8),
+        "winner": winner,
+    }
+
+
+def _worker(options, next_game, last_game, records):
+    """Worker process: claim game numbers and play them until last_game, sending each record to the writer."""
+    agents = [make_agent(options["black"], options["board_size"], options["seed"] * 2 + 1),
+              make_agent(options["white"], options["board_size"], options["seed"] * 2 + 2)]
+    while True:
+        with next_game.get_lock():
+            game = next_game.value
+            if game >= last_game:
+                break
+            next_game.value += 1
+        # Per-game seeds make each game reproducible whichever worker plays it
+        seed = options["seed"] * 1000003 + game
+        rng = random.Random(seed)
+        np.random.seed(seed % 2 ** 32)
+        record = play_game(options["board_size"], agents, rng, options["random_opening"],
+                           options["max_moves"], options["komi"], seed)
+        record["game"] = game
+        records.put(record)  # Blocks while the queue is full, so workers never outrun the writer
+    records.put(None)
+
+
+class ShardWriter:
+    """
+    Collects game records and writes them out in shards of about shard_size positions.
+    A shard only ever holds whole games, and the manifest is rewritten after every
+    shard, so an interrupted run loses at most the games of the shard in progress.
+    """
+
+    def __init__(self, directory, options, shard_size=50000):
+        self.directory = directory
+        self.shard_size = shard_size
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+            if self.manifest["board_size"] != options["board_size"]:
+                raise ValueError(f"{directory} holds {self.manifest['board_size']}x"
+                                 f"{self.manifest['board_size']} games, not {options['board_size']}x{options['board_size']}")
+        else:
+            self.manifest = {"version": 1, "board_size": options["board_size"], "games": 0,
+                             "positions": 0, "next_game": 0, "shards": []}
+        self.manifest["options"] = options
+        self.pending = []
+        self.pending_positions = 0
+
+    @property
+    def games(self):
+        return self.manifest["games"] + len(self.pending)
+
+    @property
+    def positions(self):
+        return self.manifest["positions"] + self.pending_positions
+
+    def add(self, record):
+        self.pending.append(record)
+        self.pending_positions += len(record["actions"])
+        if self.pending_positions >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """Write the pending games as a new shard and record it in the manifest."""
+        if not self.pending:
+            return
+        name = f"shard-{len(self.manifest['shards']):05d}.npz"
+        lengths = [len(record["actions"]) for record in self.pending]
+        arrays = {field: np.concatenate([record[field] for record in self.pending])
+                  for field in ("states", "actions", "players", "outcomes")}
+        arrays["game_offsets"] = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        arrays["final_states"] = np.stack([record["final_state"] for record in self.pending])
+        arrays["winners"] = np.array([record["winner"] for record in self.pending], dtype=np.int8)
+        arrays["games"] = np.array([record["game"] for record in self.pending], dtype=np.int64)
+        # Write under a temporary name and rename, so a shard is either complete or absent
+        temporary = os.path.join(self.directory, name + ".tmp")
+        with open(temporary, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(temporary, os.path.join(self.directory, name))
+
+        self.manifest["shards"].append({"file": name, "games": len(self.pending), "positions": self.pending_positions})
+        self.manifest["games"] += len(self.pending)
+        self.manifest["positions"] += self.pending_positions
+        self.manifest["next_game"] = max(self.manifest["next_game"], int(arrays["games"].max()) + 1)
+        self._write_manifest()
+        self.pending = []
+        self.pending_positions = 0
+
+    def _write_manifest(self):
+        temporary = os.path.join(self.directory, MANIFEST + ".tmp")
+        with open(temporary, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(temporary, os.path.join(self.directory, MANIFEST))
+
+
+def generate(directory, games, workers=4, black="heuristic", white="heuristic", board_size=9,
+             shard_size=50000, queue_size=64, random_opening=4, max_moves=None, komi=0, seed=0,
+             report_every=30.0):
+    """
+    Play self-play games in worker processes until the directory holds `games` games.
+    Progress (games/hour, positions/sec, queue fill) is printed every report_every seconds.
+    Returns the manifest.
+    """
+    options = {"board_size": board_size, "black": black, "white": white, "random_opening": random_opening,
+               "max_moves": max_moves, "komi": komi, "seed": seed}
+    writer = ShardWriter(directory, options, shard_size)
+    remaining = games - writer.games
+    if remaining <= 0:
+        print(f"{directory} already holds {writer.games} games.")
+        return writer.manifest
+    if writer.games:
+        print(f"Resuming from {writer.games} games in {len(writer.manifest['shards'])} shards.")
+
+    # Game numbers seed the games; a resumed run continues after the highest number written
+    first_game = writer.manifest["next_game"]
+    next_game = multiprocessing.Value("q", first_game)
+    records = multiprocessing.Queue(maxsize=queue_size)
+    processes = [multiprocessing.Process(target=_worker, args=(options, next_game, first_game + remaining, records),
+                                         daemon=True)
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    started = last_report = time.perf_counter()
+    start_games, start_positions = writer.games, writer.positions
+    running = workers
+    try:
+        while running:
+            try:
+                record = records.get(timeout=1.0)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    raise RuntimeError("All self-play workers exited unexpectedly")
+                record = False
+            if record is None:
+                running -= 1
+            elif record is not False:
+                writer.add(record)
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                last_report = now
+                elapsed = now - started
+                print(f"{writer.games}/{games} games, {writer.positions} positions, "
+                      f"{(writer.games - start_games) * 3600 / elapsed:.0f} games/hour, "
+                      f"{(writer.positions - start_positions) / elapsed:.0f} positions/sec, "
+                      f"queue {records.qsize()}/{queue_size}")
+    finally:
+        writer.flush()
+        for process in processes:
+            process.terminate()
+
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {writer.games - start_games} games ({writer.positions - start_positions} positions) in "
+          f"{elapsed:.0f}s: {(writer.games - start_games) * 3600 / elapsed:.0f} games/hour. "
+          f"{directory} now holds {writer.games} games.")
+    return writer.manifest
+
+
+def iter_games(directory, rng=None):
+    """
+    Yield every game of a self-play directory as a dict with states (moves, size, size),
+    actions, players, outcomes (for the player to move), final_state and winner (+1 black, -1 white, 0 draw).
+    Shards are read one at a time, in random order when given a numpy Generator.
+    """
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    shards = manifest["shards"]
+    if rng is not None:
+        shards = [shards[i] for i in rng.permutation(len(shards))]
+    for shard in shards:
+        with np.load(os.path.join(directory, shard["file"])) as data:
+            arrays = {field: data[field] for field in data.files}
+        offsets = arrays["game_offsets"]
+        for i in range(len(offsets) - 1):
+            moves = slice(offsets[i], offsets[i + 1])
+            yield {
+                "states": arrays["states"][moves],
+                "actions": arrays["actions"][moves],
+                "players": arrays["players"][moves],
+                "outcomes": arrays["outcomes"][moves],
+                "final_state": arrays["final_states"][i],
+                "winner": int(arrays["winners"][i]),
+            }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate self-play games for imitation_train.py.")
+    parser.add_argument("--out", default="data/selfplay", help="directory for the shards and manifest")
+    parser.add_argument("--games", type=int, default=1000, help="total games the directory should hold")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--black", default="heuristic", help="random, heuristic, mcts[:visits], ppo:path, bc:path or npz:path")
+    parser.add_argument("--white", default="heuristic")
+    parser.add_argument("--board-size", type=int, default=9)
+    parser.add_argument("--shard-size", type=int, default=50000, help="positions per shard")
+    parser.add_argument("--queue-size", type=int, default=64, help="finished games waiting to be written")
+    parser.add_argument("--random-opening", type=int, default=4, help="random moves at the start of each game")
+    parser.add_argument("--max-moves", type=int, default=None)
+    parser.add_argument("--komi", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report-every", type=float, default=30.0, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    generate(args.out, args.games, args.workers, args.black, args.white, args.board_size, args.shard_size,
+             args.queue_size, args.random_opening, args.max_moves, args.komi, args.seed, args.report_every)
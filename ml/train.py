@@ -4,25 +4,26 @@ import os
 # Add the project root to sys.path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
 
-from stable_baselines3 import PPO
-from ml.go_env import GoEnv
-from model import GoAIModel
+from ml.model import GoAIModel
+from ml.training import ThroughputCallback, make_vec_env, parse_training_args, ppo_kwargs, training_parser
 
-# Initialize the board size
-board_size = 9  # Change this to 13 or 19 for larger boards
 
-# Initialize the Go environment
-env = GoEnv(board_size)
+if __name__ == "__main__":
+    # Board size, number of parallel games, PPO settings etc. come from the command line (see --help)
+    args = parse_training_args(training_parser("Train a PPO Go model from scratch.", output="go_ai_model"))
 
-# Initialize the AI model with the environment and board size
-go_ai = GoAIModel(env, board_size)
+    # Initialize the Go environments, played in parallel
+    env = make_vec_env(args)
 
-# Train the model
-timesteps = 100000  # Adjust the number of timesteps as needed
-print(f"Training for {timesteps} timesteps...")
-go_ai.train(timesteps=timesteps)
+    # Initialize the AI model with the environment and board size
+    # Action masks (needs sb3-contrib) sample only legal moves instead of ending episodes on illegal ones
+    go_ai = GoAIModel(env, args.board_size, masked=args.action_masks, **ppo_kwargs(args))
 
-# Save the trained model
-model_path = "go_ai_model"
-go_ai.save(model_path)
-print(f"Model saved to {model_path}")
+    # Train the model
+    print(f"Training for {args.timesteps} timesteps on {args.n_envs} {args.vec_env} environments...")
+    go_ai.train(timesteps=args.timesteps, callback=ThroughputCallback())
+
+    # Save the trained model
+    go_ai.save(args.output)
+    print(f"Model saved to {args.output}")
+    env.close()
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import time
+
+import torch
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+
+from ml.batch_go_env import BatchGoEnv
+from ml.go_env import GoEnv
+
+
+def training_parser(description, output):
+    """Command line options shared by train.py and ppo_finetune.py."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--config", help="JSON file with default values for any of these options")
+    parser.add_argument("--board-size", type=int, default=9)
+    parser.add_argument("--timesteps", type=int, default=100000, help="total environment steps to train for")
+    parser.add_argument("--n-envs", type=int, default=min(8, os.cpu_count() or 1), help="games played in parallel")
+    parser.add_argument("--vec-env", choices=["subproc", "dummy", "batch"], default="subproc",
+                        help="subproc: one process per game, dummy: all in this process, "
+                             "batch: one vectorized BatchGoEnv in this process (simple ko only, no pass)")
+    parser.add_argument("--n-steps", type=int, default=2048, help="steps per game between PPO updates")
+    parser.add_argument("--batch-size", type=int, default=64, help="PPO minibatch size")
+    parser.add_argument("--torch-threads", type=int, default=None, help="threads for torch (default: torch's choice)")
+    parser.add_argument("--allow-pass", action="store_true", help="add a pass action; two passes end the game")
+    parser.add_argument("--reward-mode", choices=["exact", "estimate"], default="exact",
+                        help="exact: score every step exactly, estimate: cheap estimate until the game ends")
+    parser.add_argument("--no-action-masks", dest="action_masks", action="store_false",
+                        help="train with plain PPO instead of MaskablePPO")
+    parser.add_argument("--output", default=output, help="where to save the trained model")
+    return parser
+
+
+def parse_training_args(parser):
+    """Parse the command line, taking defaults from --config when given."""
+    args, _ = parser.parse_known_args()
+    if args.config:
+        with open(args.config) as config:
+            parser.set_defaults(**{key.replace("-", "_"): value for key, value in json.load(config).items()})
+    args = parser.parse_args()
+    if args.torch_threads:
+        torch.set_num_threads(args.torch_threads)
+    return args
+
+
+def make_vec_env(args):
+    """Create the vectorized training environment described by the command line."""
+    if args.vec_env == "batch":
+        if args.allow_pass:
+            raise ValueError("--vec-env batch has no pass action; use --vec-env subproc or dummy with --allow-pass")
+        return BatchGoEnv(args.n_envs, args.board_size, reward_mode=args.reward_mode)
+    env_fns = [lambda: GoEnv(args.board_size, args.allow_pass, args.reward_mode) for _ in range(args.n_envs)]
+    if args.vec_env == "subproc" and args.n_envs > 1:
+        return SubprocVecEnv(env_fns)
+    return DummyVecEnv(env_fns)
+
+
+def ppo_kwargs(args):
+    """PPO hyperparameters taken from the command line."""
+    return {"n_steps": args.n_steps, "batch_size": args.batch_size}
+
+
+class ThroughputCallback(BaseCallback):
+    """Log environment steps per second while collecting rollouts and gradient steps per second while training."""
+
+    def __init__(self, verbose=0):
+        super(ThroughputCallback, self).__init__(verbose)
+        self.rollout_started = None
+        self.rollout_ended = None
+
+    def _on_rollout_start(self):
+        now = time.perf_counter()
+        if self.rollout_ended is not None:
+            # The time since the last rollout ended was spent in the PPO update
+            n_samples = self.model.n_steps * self.model.n_envs
+            gradient_steps = self.model.n_epochs * -(-n_samples // self.model.batch_size)
+            self.logger.record("perf/gradient_steps_per_sec", gradient_steps / (now - self.rollout_ended))
+        self.rollout_started = now
+
+    def _on_rollout_end(self):
+        self.rollout_ended = time.perf_counter()
+        env_steps = self.model.n_steps * self.model.n_envs
+        self.logger.record("perf/env_steps_per_sec", env_steps / (self.rollout_ended - self.rollout_started))
+
+    def _on_step(self):
+        return True
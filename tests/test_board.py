@@ -0,0 +1,136 @@
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from game.ai import trailing_passes
+from game.board import Board
+
+
+def snapshot(board):
+    """Everything play() may change and undo() must restore."""
+    chains = {}
+    for point, chain in enumerate(board.chains):
+        if chain is not None:
+            chains[point] = (chain.color, frozenset(chain.stones), frozenset(chain.liberties), chain.hash)
+    return {
+        "board": board.board.copy(),
+        "chains": chains,
+        "hash": board.hash,
+        "seen_hashes": set(board.seen_hashes),
+        "ko_point": board.ko_point,
+        "current_player": board.current_player,
+        "captures": (board.captured_black, board.captured_white),
+        "estimate": board.estimate_score(),
+        "adjacent_stones": (list(board.adjacent_stones[1]), list(board.adjacent_stones[2])),
+    }
+
+
+def assert_same(before, after):
+    assert np.array_equal(before["board"], after["board"])
+    for key in before:
+        if key != "board":
+            assert before[key] == after[key], key
+
+
+def random_moves(board, rng, moves):
+    """Play random legal moves and passes; returns how many moves captured and how many made a ko."""
+    captures = kos = 0
+    for _ in range(moves):
+        legal = np.argwhere(board.legal_moves())
+        if not len(legal) or rng.random() < 0.05:
+            board.play(None, None)
+            continue
+        y, x = legal[rng.randrange(len(legal))]
+        stones = board.captured_black + board.captured_white
+        assert board.play(int(x), int(y))
+        captures += board.captured_black + board.captured_white > stones
+        kos += board.ko_point is not None
+    return captures, kos
+
+
+@pytest.mark.parametrize("size", [5, 9])
+def test_undo_restores_every_position(size):
+    rng = random.Random(size)
+    captures = kos = 0
+    for _ in range(20):
+        board = Board(size)
+        random_moves(board, rng, rng.randrange(size * size))  # Start from a random position
+        start = snapshot(board)
+        snapshots = []
+        for _ in range(3 * size * size):
+            snapshots.append(snapshot(board))
+            played_captures, played_kos = random_moves(board, rng, 1)
+            captures += played_captures
+            kos += played_kos
+        while snapshots:
+            board.undo()
+            assert_same(snapshots.pop(), snapshot(board))
+        assert_same(start, snapshot(board))
+    assert captures and kos  # The games went through captures and kos
+
+
+def test_undo_after_copy_matches_original():
+    rng = random.Random(0)
+    board = Board(7)
+    random_moves(board, rng, 60)
+    copy = board.copy()
+    before = snapshot(copy)
+    random_moves(copy, rng, 40)
+    for _ in range(40):
+        copy.undo()
+    assert_same(before, snapshot(copy))
+    assert_same(snapshot(board), snapshot(copy))
+
+
+def test_copy_keeps_trailing_passes():
+    board = Board(5)
+    board.play(2, 2)
+    board.play(None, None)
+    assert trailing_passes(board.copy()) == 1
+    board.play(None, None)
+    copy = board.copy()
+    assert trailing_passes(copy) == 2
+    copy.undo()
+    copy.undo()
+    assert copy.current_player == 2 and not copy.undo_stack
+    board.play(1, 1)
+    assert trailing_passes(board.copy()) == 0
+
+
+def test_area_score_matches_playouts():
+    from game.playout import PlayoutBoard
+
+    compared = 0
+    for seed in range(10):
+        board = Board(7)
+        playout = PlayoutBoard(7, seed)
+        passes = 0
+        while passes < 2:
+            point = playout.random_move()
+            if point < 0:
+                board.play(None, None)
+                playout.ko_point = -1
+                playout.current_player = 3 - playout.current_player
+                passes += 1
+                continue
+            y, x = divmod(point, 7)
+            if not board.play(x, y):
+                break  # A repetition that only the simple ko rule of playouts allows
+            playout.play(point, playout.current_player)
+            passes = 0
+        else:
+            assert board.area_score() == playout.score()
+            compared += 1
+    assert compared
+
+
+def test_area_score_counts_stones_and_territory():
+    board = Board(5)
+    for x, y in [(1, 0), (3, 4), (0, 1), (4, 3)]:  # Black walls off (0, 0), White (4, 4)
+        board.play(x, y)
+    assert board.area_score() == (3, 3)  # Two stones and one point each; the rest borders both
@@ -0,0 +1,156 @@
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from game.batch_board import BatchBoard
+from game.board import Board
+from game.compact_board import CompactBoard
+from game.playout import PlayoutBoard
+
+
+def superko_points(board):
+    """Points (flat y * size + x) that Board refuses only because they repeat an earlier position."""
+    seen = board.seen_hashes
+    board.seen_hashes = set()
+    try:
+        simple_ko = board.legal_moves()
+    finally:
+        board.seen_hashes = seen
+    return (simple_ko & ~board.legal_moves()).ravel()
+
+
+def assert_same_legal_moves(board, actual, superko):
+    """
+    actual: the engine's legal points, flat. With superko False the engine only knows the
+    simple ko rule, so it may also allow the points Board refuses as repetitions.
+    """
+    expected = board.legal_moves().ravel()
+    if superko:
+        assert np.array_equal(actual, expected)
+    else:
+        skip = superko_points(board)
+        assert np.array_equal(actual[~skip], expected[~skip])
+        assert actual[skip].all()
+
+
+def random_point(board, rng):
+    """A random legal point of Board, or None when there is none."""
+    legal = np.flatnonzero(board.legal_moves())
+    return int(legal[rng.randrange(len(legal))]) if len(legal) else None
+
+
+@pytest.mark.parametrize("size", [5, 9])
+@pytest.mark.parametrize("track_history", [True, False])
+def test_compact_board_matches_board(size, track_history):
+    rng = random.Random(size)
+    captures = kos = 0
+    for _ in range(10):
+        board = Board(size)
+        compact = CompactBoard(size, track_history)
+        for _ in range(3 * size * size):
+            actual = np.array([compact.is_legal(point % size, point // size) for point in range(size * size)])
+            assert_same_legal_moves(board, actual, track_history)
+            point = random_point(board, rng)
+            if point is None:
+                break
+            y, x = divmod(point, size)
+            stones = board.captured_black + board.captured_white
+            assert board.place_stone(x, y) and compact.place_stone(x, y)
+
+            assert np.array_equal(compact.get_board_state(), board.get_board_state())
+            assert (compact.captured_black, compact.captured_white) == (board.captured_black, board.captured_white)
+            assert compact.ko_point == board.ko_point
+            assert compact.current_player == board.current_player
+            assert compact.calculate_score() == board.calculate_score()
+            captures += board.captured_black + board.captured_white > stones
+            kos += board.ko_point is not None
+    assert captures and kos  # The games went through captures and kos
+
+
+@pytest.mark.parametrize("size", [5, 9])
+def test_batch_board_matches_board(size):
+    rng = random.Random(size)
+    games = 8
+    boards = [Board(size) for _ in range(games)]
+    batch = BatchBoard(games, size)
+    captures = kos = 0
+    for _ in range(3 * size * size):
+        legal = batch.legal_moves()
+        for board, actual in zip(boards, legal):
+            assert_same_legal_moves(board, actual, superko=False)
+
+        # A random legal move in every game, or a pass now and then
+        points = np.full(games, -1)
+        for game, board in enumerate(boards):
+            point = random_point(board, rng)
+            if point is None or rng.random() < 0.05:
+                board.play(None, None)
+            else:
+                points[game] = point
+        passing = points < 0
+        stones = batch.captured_black + batch.captured_white
+        assert np.array_equal(batch.place_stones(points), ~passing)
+        batch.pass_turn(passing)
+        for game in np.flatnonzero(~passing):
+            y, x = divmod(int(points[game]), size)
+            assert boards[game].place_stone(x, y)
+
+        for game, board in enumerate(boards):
+            assert np.array_equal(batch.boards[game], board.get_board_state())
+            assert (batch.captured_black[game], batch.captured_white[game]) == (board.captured_black,
+                                                                                board.captured_white)
+            assert batch.ko_point[game] == (-1 if board.ko_point is None else board.ko_point)
+            assert batch.current_player[game] == board.current_player
+        scores = batch.calculate_score()
+        estimates = batch.estimate_score()
+        for game, board in enumerate(boards):
+            assert (scores[0][game], scores[1][game]) == board.calculate_score()
+            assert (estimates[0][game], estimates[1][game]) == board.estimate_score()
+        captures += int((batch.captured_black + batch.captured_white > stones).sum())
+        kos += int((batch.ko_point >= 0).sum())
+    assert captures and kos  # The games went through captures and kos
+
+
+@pytest.mark.parametrize("size", [5, 9])
+def test_playout_board_matches_board(size):
+    rng = random.Random(size)
+    captures = kos = 0
+    for game in range(10):
+        board = Board(size)
+        playout = PlayoutBoard(size, seed=game)
+        for _ in range(3 * size * size):
+            actual = np.array([playout.color[point] == 0 and playout.is_legal(point, playout.current_player)
+                               for point in range(size * size)])
+            assert_same_legal_moves(board, actual, superko=False)
+
+            # Playouts pick their own moves: those must be legal and never fill an own eye
+            move = playout.random_move()
+            if move >= 0:
+                assert board.legal_moves().flat[move]
+                assert not playout.is_eye(move, playout.current_player)
+
+            point = random_point(board, rng)
+            if point is None:
+                break
+            stones = board.captured_black + board.captured_white
+            y, x = divmod(point, size)
+            assert board.place_stone(x, y)
+            assert playout.play(point, playout.current_player) == board.captured_black + board.captured_white - stones
+
+            assert playout.color == board.get_board_state().ravel().tolist()
+            assert playout.ko_point == (-1 if board.ko_point is None else board.ko_point)
+            assert playout.current_player == board.current_player
+            assert sorted(playout.empty) == np.flatnonzero(board.get_board_state().ravel() == 0).tolist()
+            captures += board.captured_black + board.captured_white > stones
+            kos += board.ko_point is not None
+
+        # A board built from the final position holds the same position
+        copy = PlayoutBoard.from_board(board)
+        assert copy.color == playout.color
+        assert (copy.ko_point, copy.current_player) == (playout.ko_point, playout.current_player)
+    assert captures and kos  # The games went through captures and kos